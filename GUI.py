@@ -1,9 +1,13 @@
 import pygame
 
-import copy
+import os
 import time
-from solver import solve, is_valid
-from generator import generator
+from array import array
+from solver import ACCEPT, BACKTRACK, TRY, Board, box_size, get_peers, solve, solve_steps
+from generator import generate
+from grader import Candidates, Step, next_step
+from bank import PuzzleBank
+from prefetch import Prefetcher
 
 SCREEN_WIDTH = 500
 SCREEN_HEIGHT = 740
@@ -16,6 +20,89 @@ RED = (250, 85, 85)
 PINK = (242, 206, 206)
 GREEN = (66, 219, 107)
 YELLOW = (240, 212, 24)
+PREFETCH_DEPTH = 2  # number of ready boards kept for every level
+BANK_PATH = "puzzles.bank"  # boards are drawn from this bank if it exists, generated otherwise
+FPS = 30  # frames per second at most, a frame is only drawn when something on the window changed
+TRACE_SPEED = 20  # steps of the solver shown per second by "Visual" at first
+MAX_TRACE_SPEED = 20480
+
+# areas of the window that are redrawn and updated on the screen separately
+WINDOW_AREA = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+TOP_AREA = pygame.Rect(0, 0, SCREEN_WIDTH, 49)  # level, record and timer
+BOARD_AREA = pygame.Rect(0, 49, SCREEN_WIDTH, SCREEN_WIDTH + 3)
+BUTTON_AREA = pygame.Rect(0, SCREEN_WIDTH + 52, SCREEN_WIDTH, SCREEN_HEIGHT - SCREEN_WIDTH - 52)
+MENU_BUTTON_AREA = pygame.Rect(SCREEN_WIDTH / 2 - 100, 260, 201, 351)
+
+
+class RenderCache:
+    """
+    Class used to keep fonts, rendered text, images and board grids once they are created,
+    so that drawing a frame does not load or render them again
+    """
+
+    def __init__(self):
+        self.fonts = {}  # (font, font size) -> Font
+        self.glyphs = {}  # (text, font, font size, color) -> Surface
+        self.images = {}  # path -> Surface
+        self.grids = {}  # (board size in pixels, box size) -> Surface
+
+    def font(self, font, font_size):
+        """
+        get a font, loaded from a file if the name has a "." (e.g. fonts/ghostclan.ttf), a system font otherwise
+        :return: pygame.font.Font
+        """
+        key = (font, font_size)
+        if key not in self.fonts:
+            pygame.font.init()
+            if "." in font:
+                self.fonts[key] = pygame.font.Font(font, font_size)
+            else:
+                self.fonts[key] = pygame.font.SysFont(font, font_size)
+        return self.fonts[key]
+
+    def glyph(self, text, font, font_size, color):
+        """
+        get a rendered text, for texts that come from a small set (digits, button labels):
+        every text rendered through this is kept
+        :return: Surface
+        """
+        key = (text, font, font_size, color)
+        if key not in self.glyphs:
+            self.glyphs[key] = self.font(font, font_size).render(text, True, color)
+        return self.glyphs[key]
+
+    def image(self, path):
+        """
+        get an image, loaded on first use
+        :return: Surface
+        """
+        if path not in self.images:
+            self.images[path] = pygame.image.load(path)
+        return self.images[path]
+
+    def grid(self, size, box):
+        """
+        get the lines of a board, drawn once on a surface whose other pixels are transparent
+        :param size: board size in pixels
+        :param box: box size of the board
+        :return: Surface to blit at (0, 49)
+        """
+        key = (size, box)
+        if key not in self.grids:
+            transparent = (255, 0, 255)
+            grid = pygame.Surface((size + 1, size + 2))
+            grid.fill(transparent)
+            grid.set_colorkey(transparent, pygame.RLEACCEL)
+            square_size = size / (box * box)
+            for i in range(box * box):
+                if i % box == 0 and i != 0:
+                    thick = 3
+                else:
+                    thick = 1
+                pygame.draw.line(grid, BLACK, (0, i * square_size), (size, i * square_size), thick)
+                pygame.draw.line(grid, BLACK, (i * square_size, 0), (i * square_size, size), thick)
+            self.grids[key] = grid
+        return self.grids[key]
 
 
 class Game:
@@ -23,17 +110,29 @@ class Game:
     Class used to initialize and create a window
     """
     window = None
+    clock = None
 
     # initialize game record at the start of each game (when a new game window is opened)
     record = {'Easy': "N/A", 'Medium': "N/A", 'Hard': "N/A"}
     icon_img = pygame.image.load("imgs/sudoku.png")
 
+    # boards are generated in the background so that "New Board" does not freeze the window (created with the
+    # window, so that importing this module does not map the bank or set up the prefetcher)
+    bank = None
+    prefetcher = None
+    render_cache = RenderCache()
+
     def __init__(self):
         pass
 
     def create_game(self):
+        if Game.prefetcher is None:
+            Game.bank = PuzzleBank(BANK_PATH) if os.path.exists(BANK_PATH) else None
+            Game.prefetcher = Prefetcher(PREFETCH_DEPTH, make_board=lambda level: generate(level, Game.bank))
+        Game.prefetcher.start()
         pygame.display.init()
         Game.window = pygame.display.set_mode([SCREEN_WIDTH, SCREEN_HEIGHT])
+        Game.clock = pygame.time.Clock()
         pygame.display.set_caption("Sudoku")
         pygame.display.set_icon(Game.icon_img)
 
@@ -58,15 +157,36 @@ class Menu:
         pygame.display.init()
         pygame.display.set_caption("Sudoku")
 
+        self.display_menu(WINDOW_AREA)
+        hovered = self.hovered_buttons()
         while True:
-            Game.window.fill(WHITE)
-            icon_img_width = Game.icon_img.get_width()
-            Game.window.blit(Game.icon_img, (SCREEN_WIDTH / 2 - icon_img_width / 2, 120))
-
-            self.check_button_hover()
             self.get_event()
 
-            pygame.display.update()  # Make the window updated
+            # the menu only changes when the mouse moves onto or off a button
+            if self.hovered_buttons() != hovered:
+                hovered = self.hovered_buttons()
+                self.display_menu(MENU_BUTTON_AREA)
+            Game.clock.tick(FPS)
+
+    def display_menu(self, rect):
+        """
+        redraw an area of the menu and update it on the screen
+        :param rect: pygame.Rect of the area
+        """
+        Game.window.set_clip(rect)
+        Game.window.fill(WHITE)
+        icon_img_width = Game.icon_img.get_width()
+        Game.window.blit(Game.icon_img, (SCREEN_WIDTH / 2 - icon_img_width / 2, 120))
+        self.check_button_hover()
+        Game.window.set_clip(None)
+        pygame.display.update(rect)  # Make the window updated
+
+    def hovered_buttons(self):
+        """
+        :return: a list of booleans, True for the button under the mouse
+        """
+        return [button.detect_mouse_hover()
+                for button in [self.button_easy, self.button_medium, self.button_hard, self.button_exit]]
 
     def get_event(self):
         event_list = pygame.event.get()
@@ -114,16 +234,15 @@ class MenuButtons:
         self.side_width = side_width
         self.pos_y = pos_y
 
+    def get_rect(self):
+        return pygame.Rect(SCREEN_WIDTH / 2 - 100, self.pos_y, 200, 50)
+
     def create_button(self):
-        return pygame.draw.rect(Game.window, self.button_color,
-                                pygame.Rect(SCREEN_WIDTH / 2 - 100, self.pos_y, 200, 50),
-                                self.side_width, 15)
+        return pygame.draw.rect(Game.window, self.button_color, self.get_rect(), self.side_width, 15)
 
     def create_text(self):
         """Used to create text part of buttons"""
-        pygame.font.init()
-        font = pygame.font.Font('fonts/ghostclan.ttf', self.font_size)
-        text_surface = font.render(self.text, True, self.text_color)
+        text_surface = Game.render_cache.glyph(self.text, 'fonts/ghostclan.ttf', self.font_size, self.text_color)
         text_rect = text_surface.get_rect(center=(SCREEN_WIDTH / 2, self.pos_y + 25))
         Game.window.blit(text_surface, text_rect)
 
@@ -134,7 +253,7 @@ class MenuButtons:
 
     def detect_mouse_hover(self):
         """check if the mouse is hovering over a button"""
-        return self.create_button().collidepoint(pygame.mouse.get_pos())
+        return self.get_rect().collidepoint(pygame.mouse.get_pos())
 
 
 class MainGame:
@@ -152,12 +271,15 @@ class MainGame:
         elif level == "Hard":
             pygame.display.set_caption("Sudoku-Hard")
         self.record = Game.record.get(self.level)
+        self.dirty = []  # areas of the window to redraw in the next frame
 
-        self.game_board_gui = GameBoard(generator(self.level), SCREEN_WIDTH)
+        self.game_board_gui = None
+        self.generating = False  # True while waiting for the prefetcher to have a board ready
         self.note_mode = False
         self.check_status = ""
 
         self.visualizing = False  # determine if the program is visualizing the solution
+        self.trace_player = None  # TracePlayer of the solution being visualized
 
         self.start_time = time.time()
 
@@ -167,10 +289,15 @@ class MainGame:
 
         self.click_answer = False  # used to disallow to check after "Answer" until clicking "New Board"
         self.current_time = 0
+        self.load_board()
 
         # buttons
         self.button_erase = MainGameButtons("Erase", "verdana", 15, BLACK, [100, 30], BLUE, 2,
                                             [25, SCREEN_WIDTH + 65])
+        self.button_hint = MainGameButtons("Hint", "verdana", 15, BLACK, [100, 30], BLUE, 2,
+                                           [25 + 115, SCREEN_WIDTH + 65])
+        self.button_fill = MainGameButtons("Candidates", "verdana", 15, BLACK, [100, 30], BLUE, 2,
+                                           [25 + 115 * 2, SCREEN_WIDTH + 65])
         self.button_note = None
         self.button_check = None
         self.button_reset = None
@@ -186,22 +313,97 @@ class MainGame:
                                            [25 + 115 * 2, SCREEN_WIDTH + 200])
 
     def start_game(self):
-
+        self.invalidate()
+        self.redraw()
         while True:
-            Game.window.fill(WHITE)
+            if self.generating:
+                self.load_board()
             self.get_event()
-            self.display_top_text()
+            if self.timing and int(time.time() - self.start_time) != self.current_time:
+                self.invalidate(TOP_AREA)  # the timer shows a new second
+            if self.trace_player is not None and self.trace_player.update():
+                self.invalidate(BOARD_AREA)
+                if self.trace_player.finished:
+                    self.invalidate(BUTTON_AREA)
+            self.redraw()
+            Game.clock.tick(FPS)
+
+    def invalidate(self, rect=None):
+        """
+        mark an area of the window to be redrawn in the next frame
+        :param rect: pygame.Rect of the area, None for the whole window
+        """
+        self.dirty.append(rect or WINDOW_AREA)
+
+    def redraw(self):
+        """
+        redraw the invalidated areas and update only them on the screen
+        """
+        if not self.dirty:
+            return
+        areas = []
+        for rect in [WINDOW_AREA] if WINDOW_AREA in self.dirty else self.dirty:
+            if rect not in areas:
+                areas.append(rect)
+
+        for rect in areas:
+            Game.window.set_clip(rect)
+            Game.window.fill(WHITE)
+            if rect.colliderect(TOP_AREA):
+                self.display_top_text()
+            if rect.colliderect(BOARD_AREA):
+                self.display_board()
+            if rect.colliderect(BUTTON_AREA):
+                self.display_all_buttons_text()
+        Game.window.set_clip(None)
+        pygame.display.update(areas)  # Make the window updated
+        self.dirty = []
+
+    def load_board(self):
+        """
+        take a new board from the prefetcher, or show the generating state until one is ready
+        """
+        record = Game.prefetcher.get(self.level)
+        if record is None and self.generating:
+            return  # still waiting, nothing to redraw
+        self.invalidate()
+        if record is None:
+            self.generating = True
+            self.timing = False
+            return
+
+        self.generating = False
+        self.game_board_gui = GameBoard(record.puzzle, SCREEN_WIDTH, record.solution)
+        self.check_status = ""
+        self.click_answer = False
+        self.visualizing = False
+        self.trace_player = None
+        self.timing = True
+        self.start_time = time.time()
+
+    def display_board(self):
+        """
+        display the game board, or a message while the board is being generated
+        """
+        if self.generating:
+            pygame.draw.rect(Game.window, BLACK, pygame.Rect(0, 50, SCREEN_WIDTH, SCREEN_WIDTH), 3)
+            self.add_text("Generating...", 'fonts/zorque.otf', 25, GREY, [SCREEN_WIDTH / 2, 50 + SCREEN_WIDTH / 2])
+        else:
             self.game_board_gui.display()
-            self.display_all_buttons_text()
-            pygame.display.update()  # Make the window updated
 
     def get_event(self):
         event_list = pygame.event.get()
         for event in event_list:
             if event.type == pygame.QUIT:
                 exit()
-            if event.type == pygame.KEYDOWN and not self.visualizing and not self.click_answer \
-                    and self.check_status != "Correct":
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                self.invalidate()
+            elif event.type == pygame.KEYDOWN:
+                self.invalidate(BOARD_AREA)
+            if event.type == pygame.KEYDOWN and self.trace_player is not None:
+                self.control_trace(event.key)
+            if event.type == pygame.KEYDOWN and not self.generating and not self.visualizing \
+                    and not self.click_answer and self.check_status != "Correct":
                 if event.key == pygame.K_1:
                     MainGame.key = 1
                 if event.key == pygame.K_2:
@@ -221,6 +423,16 @@ class MainGame:
                 if event.key == pygame.K_9:
                     MainGame.key = 9
             if event.type == pygame.MOUSEBUTTONDOWN:
+                if self.generating:
+                    # only the buttons that do not need a board work until the board is ready
+                    if self.button_note.detect_mouse_hover():
+                        self.note_mode = not self.note_mode
+                    if self.button_return.detect_mouse_hover():
+                        Menu().create_menu()
+                    if self.button_exit.detect_mouse_hover():
+                        exit()
+                    continue
+
                 if not self.visualizing and not self.click_answer and self.check_status != "Correct":
                     pos = pygame.mouse.get_pos()
                     clicked_square = self.game_board_gui.pos_to_row_col(pos)
@@ -236,6 +448,12 @@ class MainGame:
 
                 if self.button_note.detect_mouse_hover():
                     self.note_mode = not self.note_mode
+                if not self.visualizing and not self.click_answer and self.check_status != "Correct":
+                    if self.button_hint.detect_mouse_hover():
+                        self.check_status = ""
+                        self.game_board_gui.hint()
+                    if self.button_fill.detect_mouse_hover():
+                        self.game_board_gui.fill_candidates()
                 if self.button_check.detect_mouse_hover() and not self.visualizing and not self.click_answer:
                     self.check_status = self.game_board_gui.check()
                     if self.check_status == "Correct":
@@ -250,29 +468,28 @@ class MainGame:
 
                 if self.button_reset.detect_mouse_hover() and not self.visualizing and not self.click_answer \
                         and self.check_status != "Correct":
-                    self.game_board_gui = GameBoard(self.game_board_gui.original_board, SCREEN_WIDTH)
+                    self.game_board_gui = GameBoard(self.game_board_gui.original_board, SCREEN_WIDTH,
+                                                    self.game_board_gui.solved_board)
                     self.check_status = ""
                     self.timing = True
                     self.start_time = time.time()
 
                 if self.button_new.detect_mouse_hover():
-                    self.game_board_gui = GameBoard(generator(self.level), SCREEN_WIDTH)
-                    self.check_status = ""
-                    self.click_answer = False
                     self.visualizing = False
-                    self.timing = True
-                    self.start_time = time.time()
+                    self.load_board()
 
                 if self.button_visual.detect_mouse_hover():
                     self.visualizing = True
                     self.timing = False
-                    self.game_board_gui = GameBoard(self.game_board_gui.original_board, SCREEN_WIDTH)
+                    self.game_board_gui = GameBoard(self.game_board_gui.original_board, SCREEN_WIDTH,
+                                                    self.game_board_gui.solved_board)
                     self.check_status = ""
                     self.start_time = time.time()
-                    self.visual_solve()
+                    self.trace_player = TracePlayer(self.game_board_gui, TRACE_SPEED)
 
                 if self.button_answer.detect_mouse_hover():
                     self.click_answer = True
+                    self.trace_player = None
                     self.game_board_gui.squares = self.game_board_gui.init_squares(self.game_board_gui.solved_board)
                     self.game_board_gui.selected = None
                     self.timing = False
@@ -284,15 +501,18 @@ class MainGame:
                     exit()
 
         # check if the user tries to place numbers or make notes on selected squares.
-        if self.game_board_gui.selected and MainGame.key is not None:
+        if not self.generating and self.game_board_gui.selected and MainGame.key is not None:
             if self.note_mode:
                 if self.game_board_gui.get_selected_square().have_note_on_num(MainGame.key):
                     self.game_board_gui.get_selected_square().set_note(MainGame.key, False)
                 else:
                     self.game_board_gui.make_note(MainGame.key)
             else:
+                hint_text = self.game_board_gui.hint_text
                 self.game_board_gui.clear_note()
                 self.game_board_gui.place_number(MainGame.key)
+                if self.game_board_gui.hint_text != hint_text:
+                    self.invalidate(BUTTON_AREA)  # the hint was cleared, its text is drawn with the buttons
             MainGame.key = None
 
     def hms_to_s(self, hms):
@@ -309,6 +529,8 @@ class MainGame:
         display all text on buttons and check status
         """
         self.button_erase.button_text()
+        self.button_hint.button_text()
+        self.button_fill.button_text()
 
         # change the background color of Note button based on the mode
         if self.note_mode:
@@ -343,6 +565,42 @@ class MainGame:
             self.add_text("CORRECT!", 'fonts/zorque.otf', 25, GREEN, [SCREEN_WIDTH / 2, SCREEN_WIDTH + 125])
         elif self.check_status == "Wrong":
             self.add_text("WRONG!", 'fonts/zorque.otf', 25, RED, [SCREEN_WIDTH / 2, SCREEN_WIDTH + 125])
+        elif self.trace_player is not None:
+            if self.trace_player.finished:
+                status = "Solved"
+            elif self.trace_player.paused:
+                status = "Paused"
+            else:
+                status = str(self.trace_player.speed) + " steps/s"
+            self.add_text(status, 'verdana', 15, GREY, [SCREEN_WIDTH / 2, SCREEN_WIDTH + 125])
+        elif self.game_board_gui is not None and self.game_board_gui.hint_text:
+            self.add_text(self.game_board_gui.hint_text, 'verdana', 13, BLACK,
+                          [(SCREEN_WIDTH + 125) / 2, SCREEN_WIDTH + 125])
+
+    def control_trace(self, key):
+        """
+        control the solution being visualized from the keyboard: Space pauses and resumes, Left/Right show the
+        previous/next step, Up/Down double/halve the speed, Home goes back to the start, End skips to the solution
+        :param key: pygame key code
+        """
+        player = self.trace_player
+        if key == pygame.K_SPACE:
+            player.paused = not player.paused
+        elif key == pygame.K_RIGHT:
+            player.paused = True
+            player.seek(player.position + 1)
+        elif key == pygame.K_LEFT:
+            player.paused = True
+            player.seek(player.position - 1)
+        elif key == pygame.K_UP:
+            player.speed = min(player.speed * 2, MAX_TRACE_SPEED)
+        elif key == pygame.K_DOWN:
+            player.speed = max(player.speed // 2, 1)
+        elif key == pygame.K_HOME:
+            player.seek(0)
+        elif key == pygame.K_END:
+            player.skip_to_end()
+        self.invalidate(BUTTON_AREA)
 
     def display_top_text(self):
         """
@@ -372,7 +630,7 @@ class MainGame:
         else:
             record_rect = self.add_text(self.record, 'verdana', 20, BLACK, [SCREEN_WIDTH / 2, 35])
 
-        medal_img = pygame.image.load("imgs/medal.png")
+        medal_img = Game.render_cache.image("imgs/medal.png")
         medal_img_width = medal_img.get_width()
         Game.window.blit(medal_img, (SCREEN_WIDTH / 2 - record_rect.get_width() / 2 - medal_img_width, 22))
 
@@ -387,7 +645,7 @@ class MainGame:
                                           [SCREEN_WIDTH - 50, 35])
             else:
                 time_rect = self.add_text(self.format_time(0), 'verdana', 20, BLACK, [SCREEN_WIDTH - 50, 35])
-        timer_img = pygame.image.load("imgs/timer.png")
+        timer_img = Game.render_cache.image("imgs/timer.png")
         timer_img_width = timer_img.get_width()
         Game.window.blit(timer_img, (SCREEN_WIDTH - 50 - time_rect.get_width() / 2 - timer_img_width, 22))
 
@@ -396,12 +654,8 @@ class MainGame:
         create text based on text, font, font size, text color and position
         :return: generated text_surface
         """
-        pygame.font.init()
-        if "." in font:
-            font = pygame.font.Font(font, font_size)
-        else:
-            font = pygame.font.SysFont(font, font_size)
-        text_surface = font.render(text, True, text_color)
+        # times and records change every second, so only the font is cached
+        text_surface = Game.render_cache.font(font, font_size).render(text, True, text_color)
         text_rect = text_surface.get_rect(center=(pos[0], pos[1]))
         Game.window.blit(text_surface, text_rect)
 
@@ -419,66 +673,6 @@ class MainGame:
         formatted_time = str(hour) + ":" + str(minute) + ":" + str(second)
         return formatted_time
 
-    def visual_solve(self):
-        """
-        used to visualize the solution using backtracking algorithm
-        :return: IF the board is solvable:
-                    return True
-                ELSE:
-                    return False
-        """
-        find = self.find_empty_square()
-        updated_board = self.game_board_gui.updated_board_array()
-        if not find:  # base case: board is solved (no empty square is found)
-            return True
-
-        for i in range(1, 10):
-            if self.visualizing:
-                find.value = i
-                find.visual_color = RED
-                self.update_visual()
-
-                time.sleep(0.05)
-
-                if not is_valid(updated_board, i, [find.row, find.col]):
-                    find.value = 0
-                    continue
-
-                find.visual_color = GREEN
-                self.update_visual()
-
-                if self.visual_solve():
-                    return True
-
-                find.value = 0  # reset to 0 if this approach cannot solve the board
-
-        find.visual_color = BLACK
-        self.update_visual()
-        return False
-
-    def find_empty_square(self):
-        """
-        find the next empty Square
-        :return: IF find the next empty Square, return that Square, return None otherwise
-        """
-        for i in range(len(self.game_board_gui.squares)):
-            for j in range(len(self.game_board_gui.squares[0])):
-                if self.game_board_gui.squares[i][j].value == 0:
-                    return self.game_board_gui.squares[i][j]
-
-        return None
-
-    def update_visual(self):
-        """
-        update the game interface when visualizing the solution
-        """
-        Game.window.fill(WHITE)
-        self.get_event()
-        self.display_top_text()
-        self.display_all_buttons_text()
-        self.game_board_gui.display()
-        pygame.display.update()
-
 
 class MainGameButtons:
     """
@@ -495,19 +689,15 @@ class MainGameButtons:
         self.side_width = side_width
         self.pos = pos
 
+    def get_rect(self):
+        return pygame.Rect(self.pos[0], self.pos[1], self.button_size[0], self.button_size[1])
+
     def create_button(self):
-        return pygame.draw.rect(Game.window, self.button_color,
-                                pygame.Rect(self.pos[0], self.pos[1], self.button_size[0], self.button_size[1]),
-                                self.side_width, 10)
+        return pygame.draw.rect(Game.window, self.button_color, self.get_rect(), self.side_width, 10)
 
     def create_text(self):
         """Used to create text part of buttons"""
-        pygame.font.init()
-        if "." in self.font:
-            font = pygame.font.Font(self.font, self.font_size)
-        else:
-            font = pygame.font.SysFont(self.font, self.font_size)
-        text_surface = font.render(self.text, True, self.text_color)
+        text_surface = Game.render_cache.glyph(self.text, self.font, self.font_size, self.text_color)
         text_rect = text_surface.get_rect(center=(self.pos[0] + self.button_size[0] / 2,
                                                   self.pos[1] + self.button_size[1] / 2))
         Game.window.blit(text_surface, text_rect)
@@ -519,45 +709,316 @@ class MainGameButtons:
 
     def detect_mouse_hover(self):
         """check if the mouse is hovering over a button"""
-        return self.create_button().collidepoint(pygame.mouse.get_pos())
+        return self.get_rect().collidepoint(pygame.mouse.get_pos())
+
+
+class TracePlayer:
+    """
+    Class used to play the steps of solver.solve_steps back on a GameBoard inside the frame loop,
+    at an adjustable speed, with pause, seek and skip to the end
+    """
+
+    def __init__(self, game_board, speed=TRACE_SPEED):
+        """
+        :param game_board: GameBoard showing the original board
+        :param speed: steps shown per second
+        """
+        self.game_board = game_board
+        self.steps = solve_steps(game_board.original_board)
+        # hard boards take about a million steps, so they are kept packed, one byte per field: row, col, num and
+        # action of every step taken from self.steps so far (kept to seek back and forth), and value and index in
+        # self.colors of the visual color of the square before every step shown
+        self.read = array("B")
+        self.undo = array("B")
+        self.colors = [None, RED, GREEN, BLACK, YELLOW]
+        self.position = 0  # number of steps shown on the board
+        self.speed = speed
+        self.paused = False
+        self.finished = False  # True once every step has been shown or the solution was skipped to
+        self.skipped = False  # True while the board shows the solution instead of self.position steps
+        self.due = 0.0  # steps owed to the next frames
+        self.last_time = time.time()
+
+    def step(self, index):
+        """
+        get a step, reading the steps of the solver up to it
+        :return: IF the search has that many steps:
+                    return (row, col, num, action)
+                ELSE:
+                    return None
+        """
+        while len(self.read) <= index * 4:
+            step = next(self.steps, None)
+            if step is None:
+                return None
+            self.read.extend(step)
+        return tuple(self.read[index * 4:index * 4 + 4])
+
+    def forward(self):
+        """
+        show the next step
+        :return: True if there was one, False otherwise (the player is then finished)
+        """
+        step = self.step(self.position)
+        if step is None:
+            self.finished = True
+            return False
+
+        row, col, num, action = step
+        square = self.game_board.squares[row][col]
+        if square.visual_color not in self.colors:
+            self.colors.append(square.visual_color)
+        self.undo.append(square.value)
+        self.undo.append(self.colors.index(square.visual_color))
+        if action == TRY:
+            self.game_board.set_value(row, col, num)
+            square.visual_color = RED
+        elif action == ACCEPT:
+            square.visual_color = GREEN
+        elif action == BACKTRACK:
+            self.game_board.set_value(row, col, 0)
+            square.visual_color = BLACK
+        self.position += 1
+        return True
+
+    def backward(self):
+        """
+        take the last step shown back
+        """
+        self.position -= 1
+        row, col = self.read[self.position * 4:self.position * 4 + 2]
+        visual_color = self.colors[self.undo.pop()]
+        value = self.undo.pop()
+        self.game_board.set_value(row, col, value)
+        self.game_board.squares[row][col].visual_color = visual_color
+        self.finished = False
+
+    def seek(self, position):
+        """
+        show the board as it is after a number of steps (or after the last one if the search has fewer)
+        :param position: number of steps
+        """
+        if self.skipped:  # start again from the original board
+            self.game_board.squares = self.game_board.init_squares(self.game_board.original_board)
+            self.undo = array("B")
+            self.position = 0
+            self.skipped = False
+            self.finished = False
+        position = max(position, 0)
+        while self.position > position:
+            self.backward()
+        while self.position < position and self.forward():
+            pass
+
+    def skip_to_end(self):
+        """
+        show the solution without playing the remaining steps
+        """
+        game_board = self.game_board
+        game_board.squares = game_board.init_squares(game_board.solved_board)
+        self.skipped = True
+        self.finished = True
+
+    def update(self):
+        """
+        show the steps due since the last call, called once per frame
+        :return: True if the board changed, False otherwise
+        """
+        now = time.time()
+        elapsed = now - self.last_time
+        self.last_time = now
+        if self.paused or self.finished:
+            return False
+
+        self.due += elapsed * self.speed
+        changed = False
+        while self.due >= 1:
+            self.due -= 1
+            if not self.forward():
+                self.due = 0.0
+                return True
+            changed = True
+        return changed
 
 
 class GameBoard:
     """
-    Class used to create Sudoku board that contains 81 Square
+    Class used to create Sudoku board that contains 81 Square (size * size Square on larger boards)
     """
 
-    def __init__(self, board, size):
+    def __init__(self, board, size, solution=None):
+        """
+        :param board: unsolved board
+        :param size: width of the board on the screen
+        :param solution: solved board, None to solve the board here
+        """
         self.original_board = board
-        self.solved_board = copy.deepcopy(board)
-        solve(self.solved_board)
+        if solution is None:
+            solution = Board(board)
+            solve(solution)
+        self.solved_board = solution
         self.size = size
-        self.square_size = size / 9
+        self.box = box_size(board)
+        self.square_size = size / len(board)
         self.selected = None
         self.squares = self.init_squares(self.original_board)
 
     def init_squares(self, board):
         """
-        initialize squares on Sudoku board, set pre_filled to true if the square is not zero
+        initialize squares on Sudoku board, set pre_filled to true if the square is not zero,
+        and count the digits of every row, column and box
         :param board: sudoku game board
         :return: 2d array of Square
         """
-        squares = [[Square(board[r][c], r, c, self.size) for c in range(len(board[0]))]
+        squares = [[Square(board[r][c], r, c, self.size, self.box) for c in range(len(board[0]))]
                    for r in range(len(board))]
         for r in range(len(squares)):
             for c in range(len(squares[0])):
                 if self.original_board[r][c] != 0:
                     squares[r][c].pre_filled = True
 
+        # number of times every digit appears in every row, column and box, updated by set_value
+        size = len(board)
+        self.row_counts = [[0] * (size + 1) for _ in range(size)]
+        self.col_counts = [[0] * (size + 1) for _ in range(size)]
+        self.box_counts = [[0] * (size + 1) for _ in range(size)]
+        self.filled = 0  # number of squares holding a digit
+        self.incorrect = set()  # [row, col] tuples of the squares holding a digit other than the solution
+        self.candidates = None  # grader.Candidates of the current board, built by get_candidates on first use
+        self.hint_cells = []  # [row, col] of the squares highlighted by the last hint
+        self.hint_text = ""
+        for r in range(size):
+            for c in range(size):
+                self.count_square(r, c, board[r][c], 1)
+
         return squares
 
+    def count_square(self, row, col, val, step):
+        """
+        add (step 1) or remove (step -1) the digit of a square from the counts
+        :param val: digit of the square, 0 for an empty square
+        """
+        if val == 0:
+            return
+        self.row_counts[row][val] += step
+        self.col_counts[col][val] += step
+        self.box_counts[(row // self.box) * self.box + col // self.box][val] += step
+        self.filled += step
+        if step > 0 and val != self.solved_board[row][col]:
+            self.incorrect.add((row, col))
+        else:
+            self.incorrect.discard((row, col))
+
+    def set_value(self, row, col, val):
+        """
+        set the value of the Square at [row, col] and update the counts
+        :param val: value given to the Square, 0 to erase it
+        """
+        square = self.squares[row][col]
+        if self.candidates is not None:
+            if square.value != 0:
+                self.candidates.remove(row, col)
+            if val != 0:
+                self.candidates.place(row, col, val)
+        self.count_square(row, col, square.value, -1)
+        square.set_value(val)
+        self.count_square(row, col, val, 1)
+
+    def get_candidates(self):
+        """
+        get the candidates of the current board; built on first use (so that boards that never ask for a hint
+        do not pay for them) and kept up to date by set_value after that
+        :return: grader.Candidates
+        """
+        if self.candidates is None:
+            self.candidates = Candidates(self.updated_board_array())
+        return self.candidates
+
+    def fill_candidates(self):
+        """
+        replace the notes of every empty square by its candidates
+        """
+        candidates = self.get_candidates()
+        for r in range(len(self.squares)):
+            for c in range(len(self.squares[0])):
+                square = self.squares[r][c]
+                if square.value == 0 and not square.pre_filled:
+                    square.clear_note()
+                    for num in candidates.digits(r, c):
+                        square.set_note(num, True)
+
+    def clear_hint(self):
+        """
+        remove the highlight of the last hint
+        """
+        for row, col in self.hint_cells:
+            self.squares[row][col].visual_color = None
+        self.hint_cells = []
+        self.hint_text = ""
+
+    def hint(self):
+        """
+        find the next logical step on the current board and highlight its squares; the digits it eliminates are
+        removed from the candidates and the notes, a digit it places is left to the player
+        :return: grader.Step, None if the board is full
+        """
+        self.clear_hint()
+        if self.incorrect:
+            row, col = min(self.incorrect)
+            step = Step("mistake", [[row, col]])
+            self.hint_text = "Wrong digit at r{}c{}".format(row + 1, col + 1)
+        else:
+            candidates = self.get_candidates()
+            step, score = next_step(candidates)
+            if step is None:
+                empty = [[r, c] for r in range(len(self.squares)) for c in range(len(self.squares)) if
+                         self.squares[r][c].value == 0]
+                if not empty:
+                    return None
+                # no technique applies: give the digit of the square with the fewest candidates
+                row, col = min(empty, key=lambda square: len(candidates.digits(square[0], square[1])))
+                step = Step("reveal", [[row, col]], placements=[[row, col, self.solved_board[row][col]]])
+            for row, col, num in step.eliminations:
+                candidates.eliminate(row, col, num)
+                self.squares[row][col].set_note(num, False)
+            if step.placements:
+                row, col, num = step.placements[0]
+                self.hint_text = "{}: {} at r{}c{}".format(step.technique.capitalize(), num, row + 1, col + 1)
+            else:
+                self.hint_text = "{}: {} candidates removed".format(step.technique.capitalize(),
+                                                                   len(step.eliminations))
+
+        for row, col in step.cells:
+            self.squares[row][col].visual_color = YELLOW
+        for row, col, num in step.placements:
+            self.squares[row][col].visual_color = GREEN
+        self.hint_cells = step.cells + [[row, col] for row, col, num in step.placements]
+        return step
+
+    def in_conflict(self, row, col):
+        """
+        check if the digit of the Square at [row, col] appears more than once in its row, column or box
+        :return: True if it does, False otherwise (and for empty squares)
+        """
+        val = self.squares[row][col].value
+        if val == 0:
+            return False
+        return (self.row_counts[row][val] > 1 or self.col_counts[col][val] > 1
+                or self.box_counts[(row // self.box) * self.box + col // self.box][val] > 1)
+
     def place_number(self, val):
         """
         place the number in square if that square is not pre_filled
         :param val: number placed on the square
         """
         if not self.get_selected_square().pre_filled:
-            self.get_selected_square().set_value(val)
+            self.clear_hint()
+            row, col = self.selected
+            self.set_value(row, col, val)
+            if val != 0:  # the digit is no longer a candidate of the peers
+                for r, c in get_peers(self.box)[row * len(self.squares) + col]:
+                    if self.squares[r][c].value == 0:
+                        self.squares[r][c].set_note(val, False)
 
     def make_note(self, val):
         """
@@ -566,7 +1027,7 @@ class GameBoard:
         """
         if not self.get_selected_square().pre_filled:
             self.get_selected_square().set_note(val, True)
-            self.get_selected_square().value = 0
+            self.set_value(self.selected[0], self.selected[1], 0)
 
     def clear_note(self):
         """
@@ -595,19 +1056,11 @@ class GameBoard:
         # show squares:
         for r in range(len(self.squares)):
             for c in range(len(self.squares[0])):
+                self.squares[r][c].conflict = self.in_conflict(r, c)
                 self.squares[r][c].display()
 
         # show the lines between
-        for i in range(len(self.squares)):
-            if i % 3 == 0 and i != 0:
-                thick = 3
-            else:
-                thick = 1
-
-            pygame.draw.line(Game.window, BLACK, (0, 49 + i * self.square_size), (self.size, 49 + i * self.square_size),
-                             thick)
-            pygame.draw.line(Game.window, BLACK, (i * self.square_size, 49), (i * self.square_size, 49 + self.size),
-                             thick)
+        Game.window.blit(Game.render_cache.grid(self.size, self.box), (0, 49))
 
     def select(self, row, col):
         """
@@ -651,20 +1104,12 @@ class GameBoard:
                 IF the completed board is wrong
                     return "Wrong"
         """
-        incorrect_squares = []
-        for i in range(len(self.squares)):
-            for j in range(len(self.squares[0])):
-                if self.squares[i][j].value == 0:
-                    return "Incomplete"
-        for i in range(len(self.squares)):
-            for j in range(len(self.squares[0])):
-                if self.squares[i][j].value == self.solved_board[i][j]:
-                    continue
-                else:
-                    incorrect_squares.append(self.squares[i][j])
+        # the counts are kept up to date by set_value, so this does not scan the board
+        if self.filled < len(self.squares) * len(self.squares):
+            return "Incomplete"
 
-        self.color_square(incorrect_squares)
-        if len(incorrect_squares) == 0:
+        self.color_square(self.incorrect)
+        if len(self.incorrect) == 0:
             return "Correct"
         else:
             return "Wrong"
@@ -672,15 +1117,12 @@ class GameBoard:
     def color_square(self, incorrect_squares):
         """
         update Square color, mark invalid Squares
-        :param incorrect_squares: an array of invalid squares
+        :param incorrect_squares: a set of (row, col) of invalid squares
         """
         for i in range(len(self.squares)):
             for j in range(len(self.squares[0])):
                 if not self.squares[i][j].pre_filled:
-                    if self.squares[i][j] in incorrect_squares:
-                        self.squares[i][j].wrong = True
-                    else:
-                        self.squares[i][j].wrong = False
+                    self.squares[i][j].wrong = (i, j) in incorrect_squares
 
     def updated_board_array(self):
         """
@@ -702,11 +1144,12 @@ class Square:
     Class used to create Square
     """
 
-    def __init__(self, value, row, col, size):
+    def __init__(self, value, row, col, size, box=3):
         self.value = value
+        self.box = box  # box size of the board, notes are shown in a box x box grid
 
         # indicate if a specific number needs to be displayed as a note
-        self.note = [[False for _ in range(3)] for _ in range(3)]
+        self.note = [[False for _ in range(box)] for _ in range(box)]
 
         self.row = row
         self.col = col
@@ -714,15 +1157,15 @@ class Square:
         self.selected = False
         self.pre_filled = False
         self.wrong = False
+        self.conflict = False  # True if the digit appears more than once in the row, column or box
         self.visual_color = None
 
     def display(self):
         """
         display each Square
         """
-        pygame.font.init()
-        square_size = self.size / 9
-        sub_square_size = square_size / 3
+        square_size = self.size / (self.box * self.box)
+        sub_square_size = square_size / self.box
 
         pos_x = self.col * square_size
         pos_y = self.row * square_size + 50
@@ -742,24 +1185,24 @@ class Square:
 
         # display number or note on square
         if display_note and self.value == 0:
-            font = pygame.font.SysFont("verdana", 12)
             for r in range(len(self.note)):
                 for c in range(len(self.note[0])):
                     if self.note[r][c]:
-                        first_num = r * 3 + 1
+                        first_num = r * self.box + 1
                         num = c + first_num
-                        text_surface = font.render(str(num), True, GREY)
+                        text_surface = Game.render_cache.glyph(str(num), "verdana", 12 * 3 // self.box, GREY)
 
                         text_rect = text_surface.get_rect(center=(pos_x + sub_square_size * c + sub_square_size / 2,
                                                                   pos_y + sub_square_size * r + sub_square_size / 2))
                         Game.window.blit(text_surface, text_rect)
         elif not display_note and self.value != 0:
-            font = pygame.font.SysFont("verdana", 35)
-            if self.pre_filled:
+            if self.conflict:
+                color = RED
+            elif self.pre_filled:
                 color = BLACK
             else:
                 color = BLUE
-            text_surface = font.render(str(self.value), True, color)
+            text_surface = Game.render_cache.glyph(str(self.value), "verdana", 35 * 9 // (self.box * self.box), color)
             text_rect = text_surface.get_rect(center=(pos_x + square_size / 2, pos_y + square_size / 2))
             Game.window.blit(text_surface, text_rect)
 
@@ -788,8 +1231,8 @@ class Square:
         :param val: number needs to be checked
         :return: True if note has val, False otherwise
         """
-        row = (val - 1) // 3
-        col = (val - 1) % 3
+        row = (val - 1) // self.box
+        col = (val - 1) % self.box
         return self.note[row][col]
 
     def set_value(self, val):
@@ -806,8 +1249,8 @@ class Square:
         :param has_value: True if needs to add the val to note
                           False if need to remove the val from note
         """
-        row = (val - 1) // 3
-        col = (val - 1) % 3
+        row = (val - 1) // self.box
+        col = (val - 1) % self.box
 
         self.note[row][col] = has_value
 
@@ -815,7 +1258,7 @@ class Square:
         """
         clear all notes
         """
-        self.note = [[False for _ in range(3)] for _ in range(3)]
+        self.note = [[False for _ in range(self.box)] for _ in range(self.box)]
 
 
 if __name__ == "__main__":
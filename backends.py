@@ -0,0 +1,108 @@
+"""
+Sudoku solver backends
+
+Every backend solves a board in place through the same interface, so callers can pick one by name.
+"""
+
+import dlx
+import solver
+
+
+class Backend:
+    """
+    Class used to describe a solver backend
+    """
+    name = None
+
+    def solve(self, b):
+        """
+        solve the given sudoku board
+        Note: this function will modify the board
+        :param b: board
+        :return: True if the board is solvable, False otherwise
+        """
+        raise NotImplementedError
+
+    def count_solutions(self, b, limit=2):
+        """
+        count the solutions of the given sudoku board
+        :param b: board (not modified)
+        :param limit: stop counting after this many solutions (None to count all of them)
+        :return: number of solutions, at most limit
+        """
+        raise NotImplementedError
+
+
+class BacktrackingBackend(Backend):
+    """
+    Backend using the recursive backtracking search of solver.solve
+    """
+    name = "backtracking"
+
+    def __init__(self, strategy=None):
+        """
+        :param strategy: Strategy or name of one in solver.STRATEGIES
+        """
+        self.strategy = strategy
+
+    def solve(self, b):
+        return solver.solve(b, self.strategy)
+
+    def count_solutions(self, b, limit=2):
+        return solver.count_solutions(b, limit)
+
+
+class DLXBackend(Backend):
+    """
+    Backend using Dancing Links on the exact-cover matrix shared by the whole process
+    """
+    name = "dlx"
+
+    def solve(self, b):
+        return dlx.solve(b)
+
+    def count_solutions(self, b, limit=2):
+        return dlx.count_solutions(b, limit)
+
+
+BACKENDS = {
+    "backtracking": BacktrackingBackend(),
+    "dlx": DLXBackend(),
+}
+
+
+def get_backend(backend=None):
+    """
+    get a Backend from its name
+    :param backend: a Backend, a name in BACKENDS or None for "backtracking"
+    :return: Backend
+    """
+    if backend is None:
+        return BACKENDS["backtracking"]
+    if isinstance(backend, Backend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError("unknown backend: " + str(backend))
+    return BACKENDS[backend]
+
+
+def solve(b, backend=None):
+    """
+    solve the given sudoku board with the selected backend
+    Note: this function will modify the board
+    :param b: board
+    :param backend: Backend or name of one in BACKENDS, None for "backtracking"
+    :return: True if the board is solvable, False otherwise
+    """
+    return get_backend(backend).solve(b)
+
+
+def count_solutions(b, limit=2, backend=None):
+    """
+    count the solutions of the given sudoku board with the selected backend
+    :param b: board (not modified)
+    :param limit: stop counting after this many solutions (None to count all of them)
+    :param backend: Backend or name of one in BACKENDS, None for "backtracking"
+    :return: number of solutions, at most limit
+    """
+    return get_backend(backend).count_solutions(b, limit)
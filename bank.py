@@ -0,0 +1,212 @@
+"""
+Sudoku Puzzle Bank
+
+A binary file of fixed-size records (puzzle, solution, level, clue count, grader score) sorted by level,
+read through mmap so that picking a random board of a level is one slice of the file and no parsing.
+
+File layout (little endian):
+    header (64 bytes): magic "SDKB", version, record size, record count,
+                       then [first record, record count] for every level in LEVELS
+    records: puzzle (41 bytes, two squares per byte), solution (41 bytes), level, clue count, score (2 bytes)
+
+usage: python bank.py build puzzles.bank --count 1000 --workers 4 --seed 1
+       python bank.py info puzzles.bank
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+
+from batch_generate import generate_batch
+from canonical import dedup
+from generator import LEVELS
+from grader import grade
+
+MAGIC = b"SDKB"
+VERSION = 2  # version 1 scored boards by search nodes
+HEADER = struct.Struct("<4sHHI" + "II" * len(LEVELS))
+HEADER_SIZE = 64
+BOARD_SIZE = 41  # 81 squares, 4 bits each
+META = struct.Struct("<BBH")  # level, clue count, score
+RECORD_SIZE = BOARD_SIZE * 2 + META.size
+
+
+def pack_board(b):
+    """
+    pack a board into 41 bytes, two squares per byte
+    :param b: board
+    :return: bytes
+    """
+    values = [b[r][c] for r in range(9) for c in range(9)] + [0]
+    return bytes((values[i] << 4) | values[i + 1] for i in range(0, 82, 2))
+
+
+def unpack_board(data):
+    """
+    unpack a board packed by pack_board
+    :param data: 41 bytes
+    :return: board
+    """
+    values = []
+    for byte in data:
+        values.append(byte >> 4)
+        values.append(byte & 0xF)
+    return [values[r * 9:r * 9 + 9] for r in range(9)]
+
+
+def difficulty_score(b):
+    """
+    score a board by the hardest technique needed to solve it (grader.grade)
+    :param b: board (not modified)
+    :return: an integer, 100 times the grader score
+    """
+    return int(round(grade(b)["score"] * 100))
+
+
+def pack_record(puzzle, solution, level, score=None):
+    """
+    pack a board and its solution into a bank record
+    :param puzzle: unsolved board
+    :param solution: solved board
+    :param level: one of LEVELS
+    :param score: difficulty score, None to compute it with difficulty_score
+    :return: bytes of length RECORD_SIZE
+    """
+    clues = sum(1 for r in range(9) for c in range(9) if puzzle[r][c] != 0)
+    if score is None:
+        score = difficulty_score(puzzle)
+    return pack_board(puzzle) + pack_board(solution) + META.pack(LEVELS.index(level), clues, score)
+
+
+def write_bank(path, records):
+    """
+    write a bank file
+    :param path: path of the bank file
+    :param records: iterable of records packed by pack_record, in any level order
+    :return: number of records written
+    """
+    by_level = [bytearray() for _ in LEVELS]
+    for record in records:
+        level = record[BOARD_SIZE * 2]
+        by_level[level] += record
+
+    index = []
+    first = 0
+    for data in by_level:
+        count = len(data) // RECORD_SIZE
+        index += [first, count]
+        first += count
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, first, *index).ljust(HEADER_SIZE, b"\0"))
+        for data in by_level:
+            f.write(data)
+    return first
+
+
+class PuzzleBank:
+    """
+    Class used to read a bank file through mmap
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        fields = HEADER.unpack_from(self.data, 0)
+        magic, version, record_size, self.size = fields[:4]
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError(path + " is not a puzzle bank of version " + str(VERSION))
+        # [first record, record count] of every level
+        self.index = {level: [fields[4 + i * 2], fields[5 + i * 2]] for i, level in enumerate(LEVELS)}
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def count(self, level):
+        """
+        get the number of boards of a level
+        :param level: one of LEVELS
+        :return: an integer
+        """
+        return self.index[level][1]
+
+    def record(self, i):
+        """
+        read the record at position i
+        :param i: position of the record in the bank
+        :return: a dict {"puzzle", "solution", "level", "clues", "score"}
+        """
+        start = HEADER_SIZE + i * RECORD_SIZE
+        data = self.data[start:start + RECORD_SIZE]
+        level, clues, score = META.unpack_from(data, BOARD_SIZE * 2)
+        return {"puzzle": unpack_board(data[:BOARD_SIZE]), "solution": unpack_board(data[BOARD_SIZE:BOARD_SIZE * 2]),
+                "level": LEVELS[level], "clues": clues, "score": score}
+
+    def random(self, level, rng=random):
+        """
+        read a random record of a level
+        :param level: one of LEVELS
+        :param rng: random.Random (or the random module) used to pick the record
+        :return: IF the bank has boards of this level:
+                    return the record dict of record()
+                ELSE:
+                    return None
+        """
+        first, count = self.index.get(level, [0, 0])
+        if count == 0:
+            return None
+        return self.record(first + rng.randrange(count))
+
+
+def solved_records(results):
+    """
+    turn results of batch_generate.generate_batch into bank records, skipping boards that are a symmetry of a board
+    already taken (canonical.dedup)
+    :param results: iterable of result dicts
+    :return: a generator of packed records
+    """
+    for result in dedup(results, lambda result: result["board"]):
+        yield pack_record(result["board"], result["solution"], result["level"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a Sudoku puzzle bank.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="generate boards into a new bank file")
+    build.add_argument("path")
+    build.add_argument("--count", type=int, default=100, help="number of boards per level")
+    build.add_argument("--levels", nargs="+", choices=LEVELS, default=LEVELS)
+    build.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    build.add_argument("--seed", type=int, default=0, help="seed of the whole batch")
+    info = commands.add_parser("info", help="print the number of boards per level")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        results = generate_batch(args.count, args.levels, args.workers, args.seed)
+        written = write_bank(args.path, solved_records(results))
+        print("{} boards written to {}".format(written, args.path), file=sys.stderr)
+    else:
+        with PuzzleBank(args.path) as bank:
+            for level in LEVELS:
+                print("{:<7} {}".format(level, bank.count(level)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Batch Sudoku Generator
+
+Generate many boards per level on a process pool, streaming every board back as soon as it is ready.
+
+usage: python batch_generate.py --count 100 --levels Easy Medium Hard --workers 4 --seed 1 > puzzles.txt
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+from generator import LEVELS, generate
+from solver import board_to_line
+
+
+def task_seed(seed, level, index):
+    """
+    derive the seed of a single board from the batch seed, so the board does not depend on
+    which worker generates it or in which order the boards finish
+    :param seed: seed of the whole batch
+    :param level: level of the board
+    :param index: index of the board within its level
+    :return: an integer seed
+    """
+    return seed * 1000003 + LEVELS.index(level) * 10000019 + index
+
+
+def generate_one(task):
+    """
+    generate a single board in a worker process
+    :param task: [level, index, seed]
+    :return: a dict {"level", "index", "seed", "id", "board", "solution", "nodes", "seconds", "worker"}
+    """
+    level, index, seed = task
+    record = generate(level, seed=seed)
+    return {"level": level, "index": index, "seed": seed, "id": record.puzzle_id, "board": record.puzzle,
+            "solution": record.solution, "nodes": record.nodes, "seconds": record.seconds, "worker": os.getpid()}
+
+
+def generate_batch(count, levels=None, workers=None, seed=0):
+    """
+    generate count boards for every level on a process pool
+    :param count: number of boards per level
+    :param levels: list of levels, None for every level
+    :param workers: number of worker processes, None for one per core
+    :param seed: seed of the whole batch, the same seed always gives the same boards
+    :return: a generator yielding the result dict of generate_one for every board, in the order they finish
+    """
+    if levels is None:
+        levels = LEVELS
+    tasks = [[level, index, task_seed(seed, level, index)] for level in levels for index in range(count)]
+
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(generate_one, tasks):
+            yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Sudoku boards on a process pool.")
+    parser.add_argument("--count", type=int, default=10, help="number of boards per level")
+    parser.add_argument("--levels", nargs="+", choices=LEVELS, default=LEVELS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the whole batch")
+    parser.add_argument("--output", default="-", help="output file, - for stdout")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    start = time.perf_counter()
+    generated = 0
+    try:
+        # one line per board: level, seed and the 81 squares (0 for empty squares)
+        for result in generate_batch(args.count, args.levels, args.workers, args.seed):
+            out.write("{} {} {}\n".format(result["level"], result["seed"], board_to_line(result["board"])))
+            out.flush()
+            generated += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    rate = generated / elapsed if elapsed else 0.0
+    cores = min(args.workers, os.cpu_count())
+    print("{} boards in {:.2f} s: {:.1f} boards/s, {:.1f} boards/s per core ({} workers on {} cores)".format(
+        generated, elapsed, rate, rate / cores, args.workers, cores), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
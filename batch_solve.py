@@ -0,0 +1,127 @@
+"""
+Batch Sudoku Solver (requires numpy)
+
+Solve thousands of boards at once: constraint propagation (naked and hidden singles) runs on a candidate tensor
+of shape (boards, 81 squares, 9 digits) for every board together, and only the boards that propagation cannot
+finish are handed to solver.solve one by one.
+A digit is allowed in a square under the same rule as solver.is_valid: it must not repeat in the row,
+the column or the box.
+"""
+
+import numpy as np
+
+from solver import solve
+
+# status of every board
+INVALID = -1  # the given numbers already repeat a digit in a row, a column or a box
+UNSOLVABLE = 0
+SOLVED = 1
+
+# UNITS[u, s] is True if square s belongs to unit u (9 rows, 9 columns, 9 boxes)
+UNITS = np.zeros((27, 81), dtype=bool)
+for _i in range(9):
+    for _j in range(9):
+        UNITS[_i, _i * 9 + _j] = True  # row
+        UNITS[9 + _i, _j * 9 + _i] = True  # column
+        UNITS[18 + _i, ((_i // 3) * 3 + _j // 3) * 9 + (_i % 3) * 3 + _j % 3] = True  # box
+
+# PEERS[s, t] is True if squares s and t are different and share a unit
+PEERS = (UNITS.T.astype(np.int32) @ UNITS.astype(np.int32)) > 0
+np.fill_diagonal(PEERS, False)
+
+_UNITS_F = UNITS.astype(np.float32)
+_PEERS_F = PEERS.astype(np.float32)
+
+
+def given_conflicts(grids):
+    """
+    find the boards whose given numbers repeat a digit in a unit
+    :param grids: array (N, 81) of digits, 0 for empty squares
+    :return: bool array (N,)
+    """
+    onehot = (grids[:, :, None] == np.arange(1, 10)).astype(np.float32)
+    return (np.matmul(_UNITS_F, onehot) > 1).any(axis=(1, 2))
+
+
+def propagate(cand):
+    """
+    apply naked and hidden singles to every board until nothing changes
+    Note: this function will modify cand
+    :param cand: bool array (N, 81, 9), cand[n, s, d] is True if digit d + 1 is still allowed in square s of board n
+    :return: bool array (N,), True for the boards that reached a contradiction
+    """
+    dead = np.zeros(len(cand), dtype=bool)
+    active = np.arange(len(cand))
+    while len(active):
+        c = cand[active]
+        before = c.sum(axis=(1, 2))
+
+        # naked singles: a square with one candidate removes that digit from its peers
+        single = c & (c.sum(axis=2, keepdims=True) == 1)
+        c &= ~(np.matmul(_PEERS_F, single.astype(np.float32)) > 0)
+
+        # hidden singles: a digit allowed in only one square of a unit must go there
+        per_unit = np.matmul(_UNITS_F, c.astype(np.float32))  # (n, 27, 9)
+        hidden = np.matmul(_UNITS_F.T, (per_unit == 1).astype(np.float32)) > 0  # (n, 81, 9)
+        forced = hidden & c
+        has_forced = forced.any(axis=2, keepdims=True)
+        c = np.where(has_forced, forced, c)
+
+        counts = c.sum(axis=2)
+        contradiction = (counts == 0).any(axis=1) | (forced.sum(axis=2) > 1).any(axis=1) \
+            | (per_unit == 0).any(axis=(1, 2))
+        cand[active] = c
+        dead[active[contradiction]] = True
+
+        changed = c.sum(axis=(1, 2)) != before
+        done = (counts == 1).all(axis=1) & ~contradiction
+        # hidden singles of different units can force two peers to the same digit in one pass, which the checks
+        # above only see in the next pass: check the filled boards before they leave the loop
+        if done.any():
+            broken = given_conflicts(c[done].argmax(axis=2) + 1)
+            dead[active[done][broken]] = True
+        active = active[changed & ~contradiction & ~done]
+    return dead
+
+
+def solve_batch(puzzles, chunk=10000):
+    """
+    solve a batch of boards
+    :param puzzles: array-like (N, 9, 9) of digits, 0 for empty squares (not modified)
+    :param chunk: number of boards propagated together, bounds the memory used
+    :return: [solutions, status, searched]
+             solutions: int8 array (N, 9, 9), the solved boards (the puzzle itself if not SOLVED)
+             status: int8 array (N,) of INVALID, UNSOLVABLE or SOLVED
+             searched: bool array (N,), True for the boards that needed solver.solve after propagation
+    """
+    grids = np.asarray(puzzles).reshape(-1, 81).astype(np.int8)
+    if grids.size and (grids.min() < 0 or grids.max() > 9):
+        raise ValueError("squares must hold digits 0-9")
+    count = len(grids)
+    solutions = grids.copy()
+    status = np.full(count, UNSOLVABLE, dtype=np.int8)
+    searched = np.zeros(count, dtype=bool)
+
+    for start in range(0, count, chunk):
+        part = grids[start:start + chunk]
+        invalid = given_conflicts(part)
+
+        cand = np.where(part[:, :, None] == 0, True, part[:, :, None] == np.arange(1, 10))
+        dead = propagate(cand) | invalid
+        done = ~dead & (cand.sum(axis=2) == 1).all(axis=1)
+
+        index = np.arange(start, start + len(part))
+        status[index[invalid]] = INVALID
+        status[index[done]] = SOLVED
+        solutions[index[done]] = cand[done].argmax(axis=2) + 1
+
+        # the rest goes to the backtracking search, starting from the squares propagation already fixed
+        for i in np.flatnonzero(~dead & ~done):
+            fixed = cand[i].sum(axis=1) == 1
+            board = np.where(fixed, cand[i].argmax(axis=1) + 1, 0).reshape(9, 9).tolist()
+            searched[start + i] = True
+            if solve(board, "mrv"):
+                solutions[start + i] = np.array(board, dtype=np.int8).reshape(81)
+                status[start + i] = SOLVED
+
+    return solutions.reshape(-1, 9, 9), status, searched
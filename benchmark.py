@@ -0,0 +1,319 @@
+"""
+Sudoku Benchmarks
+
+Time solver.solve (with every strategy), generator.generate per level, generator.check_unique_sol and
+GameBoard.check on corpora generated locally from fixed seeds, check that every solver backend finds the same
+solution, and compare the results with a stored baseline.
+
+The "pathological" corpus relabels the digits of Hard boards so that the first empty squares in row-major order
+must hold 9, 8, 7, ...: row-major backtracking tries every smaller digit first at each of them.
+The "fixed" corpus is FIXED_BOARDS, boards known to be hard for row-major backtracking (which is not timed on them).
+
+Randomized strategies run with a fixed seed so that their node counts repeat. Every run of a case is surrounded by
+runs of calibrate(), a fixed solve, and the times are compared as multiples of it ("relative"), so that a machine
+that is slower for a while (another process, frequency scaling) slows both and does not look like a regression.
+A case also only counts as slower when it is slower by --min-seconds, so that noise on very short cases is ignored.
+
+usage: python benchmark.py                  run and compare with bench_baseline.json if it exists
+       python benchmark.py --save           run and store the results as the new baseline
+       python benchmark.py --threshold 0.5  fail if a case is more than 50% slower than the baseline
+"""
+
+import argparse
+import copy
+import json
+import os
+import statistics
+import sys
+import time
+
+import backends
+import solver
+from generator import LEVELS, check_unique_sol, generate
+
+BASELINE_PATH = "bench_baseline.json"
+STRATEGY_SEED = 1  # seed of the randomized strategies
+
+# hard for row-major backtracking: the first row of the solution is 9 8 7 6 5 4 3 2 1
+FIXED_BOARDS = [
+    "..............3.85..1.2.......5.7.....4...1...9.......5......73..2.1........4...9",
+]
+# reference workload of the relative times, solved with the mrv strategy in a few tens of milliseconds
+CALIBRATION_BOARD = "000000012000000003002300400001800005060070800000009000008500000900040500470006000"
+
+
+def make_corpus(level, count, seed):
+    """
+    generate a corpus of boards from a fixed seed
+    :param level: one of LEVELS
+    :param count: number of boards
+    :param seed: seed of the corpus, board i is generated from the seed seed * 1000 + i
+    :return: list of boards
+    """
+    return [generate(level, seed=seed * 1000 + i).puzzle for i in range(count)]
+
+
+def make_pathological(boards):
+    """
+    relabel the digits of boards so that row-major backtracking reaches the right digit last on the first empty squares
+    :param boards: list of boards with a unique solution (not modified)
+    :return: list of relabeled boards
+    """
+    result = []
+    for b in boards:
+        solution = solver.Board(b)
+        solver.solve(solution)
+        relabel = {}
+        target = 9
+        for r in range(9):
+            for c in range(9):
+                if b[r][c] == 0 and solution[r][c] not in relabel:
+                    relabel[solution[r][c]] = target
+                    target -= 1
+        for num in range(1, 10):  # digits that are never the answer of an empty square
+            if num not in relabel:
+                relabel[num] = target
+                target -= 1
+        result.append([[relabel[num] if num else 0 for num in row] for row in b])
+    return result
+
+
+def calibrate():
+    """
+    the reference workload of the relative times: solve CALIBRATION_BOARD with the mrv strategy
+    :return: wall time in seconds
+    """
+    b = solver.line_to_board(CALIBRATION_BOARD)
+    start = time.perf_counter()
+    solver.solve(b, "mrv")
+    return time.perf_counter() - start
+
+
+def timed(function, repeat):
+    """
+    run function repeat times, calibrate() before and after every run
+    :return: [smallest wall time in seconds (reported, and used by the --min-seconds floor of compare),
+             median over the runs of the wall time divided by the mean of the two calibration times around it
+             (the time compare checks against the threshold), value returned by the last run]
+    """
+    best = None
+    ratios = []
+    value = None
+    before = calibrate()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - start
+        after = calibrate()
+        best = elapsed if best is None else min(best, elapsed)
+        ratios.append(elapsed * 2 / (before + after))
+        before = after
+    return best, statistics.median(ratios), value
+
+
+def bench_strategy(name):
+    """
+    get a strategy of solver.STRATEGIES, seeded with STRATEGY_SEED if it is randomized
+    :param name: name of the strategy
+    :return: Strategy
+    """
+    strategy = solver.STRATEGIES[name]
+    if strategy.randomized:
+        strategy = copy.copy(strategy)
+        strategy.seed = STRATEGY_SEED
+    return strategy
+
+
+def bench_solve(corpus, strategy):
+    """
+    solve every board of a corpus with a strategy
+    :return: total number of search nodes
+    """
+    nodes = 0
+    for b in corpus:
+        nodes += solver.compare_strategies(b, [bench_strategy(strategy)])[0]["nodes"]
+    return nodes
+
+
+def bench_unique(corpus):
+    """
+    run check_unique_sol on every given number of every board
+    :return: total number of given numbers checked
+    """
+    checked = 0
+    for b in corpus:
+        b = [list(row) for row in b]  # as in the generator: a Board would be copied to a list by every check
+        for r in range(9):
+            for c in range(9):
+                if b[r][c] != 0:
+                    check_unique_sol(b, r, c)
+                    checked += 1
+    return checked
+
+
+def load_game_board():
+    """
+    import GameBoard from the game
+    :return: GameBoard, None if pygame is not installed or the game cannot load its files
+             (the images and fonts are found relative to the repository directory)
+    """
+    try:
+        from GUI import GameBoard
+    except (ImportError, OSError):
+        return None
+    return GameBoard
+
+
+def bench_check(corpus, solutions, GameBoard):
+    """
+    fill GameBoard with the solution of every board and run check
+    :param corpus: list of boards
+    :param solutions: solution of every board, given to GameBoard so that it does not solve the board itself
+    :return: number of boards checked
+    """
+    checked = 0
+    for b, solution in zip(corpus, solutions):
+        game_board = GameBoard(b, 500, solution)
+        for r in range(9):
+            for c in range(9):
+                game_board.set_value(r, c, game_board.solved_board[r][c])
+        game_board.check()
+        checked += 1
+    return checked
+
+
+def check_backends(corpus, row_major=True):
+    """
+    solve every board with every backend, using every strategy for the backtracking backend
+    :param corpus: list of boards with a unique solution
+    :param row_major: False to leave out row-major backtracking (for boards it cannot solve in reasonable time)
+    :return: list of error messages, empty if they all agree
+    """
+    errors = []
+    solvers = [["dlx", backends.get_backend("dlx")]]
+    solvers += [["backtracking " + name, backends.BacktrackingBackend(name)] for name in solver.STRATEGIES
+                if row_major or name != "row-major"]
+    for i, b in enumerate(corpus):
+        expected = None
+        for name, backend in solvers:
+            result = solver.Board(b)
+            if not backend.solve(result):
+                errors.append("board {}: {} found no solution".format(i, name))
+            elif expected is None:
+                expected = result
+            elif result != expected:
+                errors.append("board {}: {} found a different solution".format(i, name))
+    return errors
+
+
+def run(count, seed, repeat):
+    """
+    run every benchmark
+    :param count: number of boards per corpus
+    :param seed: seed of the corpora
+    :param repeat: number of runs per case (see timed)
+    :return: [results, errors], results maps a case name to {"seconds", "relative", "nodes"}: the fastest run, the
+             median run relative to the calibration runs, and the search nodes
+    """
+    corpora = {level: make_corpus(level, count, seed + i) for i, level in enumerate(LEVELS)}
+    corpora["pathological"] = make_pathological(corpora["Hard"])
+    corpora["fixed"] = [solver.line_to_board(line) for line in FIXED_BOARDS]
+
+    GameBoard = load_game_board()
+    results = {}
+    for name, corpus in corpora.items():
+        solutions = []
+        for b in corpus:
+            solution = solver.Board(b)
+            solver.solve(solution, "propagate")
+            solutions.append(solution)
+        for strategy in solver.STRATEGIES:
+            if name == "fixed" and strategy == "row-major":
+                continue  # these boards are chosen to take row-major backtracking far too long
+            seconds, relative, nodes = timed(lambda: bench_solve(corpus, strategy), repeat)
+            results["solve/{}/{}".format(name, strategy)] = {"seconds": seconds, "relative": relative, "nodes": nodes}
+        seconds, relative, _ = timed(lambda: bench_unique(corpus), repeat)
+        results["unique/" + name] = {"seconds": seconds, "relative": relative}
+        if GameBoard is not None:
+            seconds, relative, _ = timed(lambda: bench_check(corpus, solutions, GameBoard), repeat)
+            results["check/" + name] = {"seconds": seconds, "relative": relative}
+
+    for i, level in enumerate(LEVELS):
+        seconds, relative, _ = timed(lambda: make_corpus(level, count, seed + i), repeat)
+        results["generate/" + level] = {"seconds": seconds, "relative": relative}
+
+    errors = check_backends([b for name, corpus in corpora.items() if name != "fixed" for b in corpus])
+    errors += check_backends(corpora["fixed"], row_major=False)
+    return results, errors
+
+
+def compare(results, baseline, threshold, min_seconds=0.0):
+    """
+    compare results with a baseline
+    :param threshold: allowed relative slowdown, e.g. 0.2 for 20%
+    :param min_seconds: a time only counts as a regression if it is also this many seconds slower
+    :return: list of regression messages
+    """
+    regressions = []
+    for case, result in sorted(results.items()):
+        if case not in baseline:
+            continue
+        # times are compared relative to the calibration run when both sides have it (older baselines do not)
+        time_key = "relative" if "relative" in result and "relative" in baseline[case] else "seconds"
+        for key in [time_key, "nodes"]:
+            if key in result and key in baseline[case] and baseline[case][key] > 0:
+                change = result[key] / baseline[case][key] - 1
+                if key == time_key and result["seconds"] - baseline[case]["seconds"] <= min_seconds:
+                    continue
+                if change > threshold:
+                    regressions.append("{} {}: {:.4g} -> {:.4g} (+{:.0%})".format(
+                        case, key, baseline[case][key], result[key], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Sudoku benchmarks.")
+    parser.add_argument("--count", type=int, default=10, help="number of boards per corpus")
+    parser.add_argument("--seed", type=int, default=2024, help="seed of the corpora")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of runs per case, compared by their median time relative to a calibration solve")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-seconds", type=float, default=0.005,
+                        help="a case only counts as slower if it is also slower by this many seconds")
+    args = parser.parse_args(argv)
+
+    results, errors = run(args.count, args.seed, args.repeat)
+    for case, result in sorted(results.items()):
+        nodes = "{:>12} nodes".format(result["nodes"]) if "nodes" in result else ""
+        print("{:<36} {:>10.4f} s {}".format(case, result["seconds"], nodes))
+
+    if not any(case.startswith("check/") for case in results):
+        print("the game could not be loaded (pygame missing or run outside the repository), "
+              "GameBoard.check was not timed")
+    for error in errors:
+        print("MISMATCH " + error)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"count": args.count, "seed": args.seed, "results": results}, f, indent=2, sort_keys=True)
+        print("baseline saved to " + args.baseline)
+        return 1 if errors else 0
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["count"] != args.count or baseline["seed"] != args.seed:
+            print("baseline was recorded with different corpora, not compared")
+        else:
+            regressions = compare(results, baseline["results"], args.threshold, args.min_seconds)
+    for regression in regressions:
+        print("REGRESSION " + regression)
+
+    return 1 if errors or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Sudoku board canonicalization
+
+Boards that differ only by a Sudoku symmetry (relabeling the digits, permuting the rows of a band, the columns of a
+stack, the bands, the stacks, and transposing) have the same solutions up to that symmetry.
+canonicalize() maps every board to one representative of its class, the smallest board in reading order with the
+digits relabeled in order of appearance (0, the empty square, sorts first), and returns the symmetry that maps the
+board to it, so a solution of the representative can be mapped back to a solution of the board.
+
+The representative is built one canonical row at a time: only the partial transforms whose rows so far are the
+smallest are kept, so the search follows the few transforms that tie instead of trying all of them.
+Sparse, completed or very symmetric boards (an empty board, a board with one clue, many 16x16 boards) tie on so many
+transforms that canonicalize gives up after MAX_STATES of them: dedup then keys such a board on its own squares and
+ClassSolveCache solves it without the cache.
+"""
+
+from solver import Board, box_size, board_to_line, solve
+
+# partial transforms that may tie at once before canonicalize gives up: generated 9x9 boards need a few thousand,
+# while completed boards need a few tens of thousands and are left to the fallbacks
+MAX_STATES = 20000
+
+
+class TooManyTies(Exception):
+    """
+    Raised by canonicalize when more than its limit of partial transforms tie
+    """
+
+
+class Transform:
+    """
+    Class used to describe a Sudoku symmetry: the canonical square [i, j] holds digits[g[rows[i]][cols[j]]],
+    where g is the board, transposed first if transpose is True
+    """
+
+    def __init__(self, transpose, rows, cols, digits):
+        """
+        :param transpose: True to transpose the board first
+        :param rows: original row of every canonical row (of the transposed board if transpose is True)
+        :param cols: original column of every canonical column
+        :param digits: list mapping every digit to its canonical digit, digits[0] is 0
+        """
+        self.transpose = transpose
+        self.rows = rows
+        self.cols = cols
+        self.digits = digits
+
+    def apply(self, b):
+        """
+        map a board to the canonical frame
+        :param b: board (not modified)
+        :return: the transformed board as a list of lists
+        """
+        g = transposed(b) if self.transpose else b
+        return [[self.digits[g[r][c]] for c in self.cols] for r in self.rows]
+
+    def invert(self, b):
+        """
+        map a board of the canonical frame back, e.g. the solution of the canonical board to the solution of the board
+        :param b: board in the canonical frame (not modified)
+        :return: the board in the original frame as a list of lists
+        """
+        size = len(b)
+        labels = [0] * (size + 1)
+        for num, label in enumerate(self.digits):
+            labels[label] = num
+        g = [[0] * size for _ in range(size)]
+        for i, r in enumerate(self.rows):
+            for j, c in enumerate(self.cols):
+                g[r][c] = labels[b[i][j]]
+        return transposed(g) if self.transpose else g
+
+    def to_dict(self):
+        """
+        :return: a dict of the transform that can be converted to JSON
+        """
+        return {"transpose": self.transpose, "rows": list(self.rows), "cols": list(self.cols),
+                "digits": list(self.digits)}
+
+
+def transposed(b):
+    """
+    :param b: board
+    :return: the transposed board as a list of lists
+    """
+    return [[b[r][c] for r in range(len(b))] for c in range(len(b))]
+
+
+def allowed(order, box, size, cache):
+    """
+    get the lines that can come next in a canonical order: any line of an unused band at the start of a band,
+    otherwise an unused line of the current band
+    :param order: tuple of the lines chosen so far
+    :param box: box size
+    :param size: board size
+    :param cache: dict of the lines already computed for an order
+    :return: list of lines
+    """
+    lines = cache.get(order)
+    if lines is None:
+        start = len(order) - len(order) % box
+        if start == len(order):
+            used = set(line // box for line in order)
+            lines = [line for line in range(size) if line // box not in used]
+        else:
+            band = order[start] // box
+            lines = [line for line in range(band * box, band * box + box) if line not in order]
+        cache[order] = lines
+    return lines
+
+
+def canonicalize(b, max_states=MAX_STATES):
+    """
+    map a board to the representative of its class under the Sudoku symmetries
+    :param b: board (not modified)
+    :param max_states: number of tied partial transforms kept at most
+    :return: [canonical board as a list of lists, Transform such that transform.apply(b) is the canonical board]
+    :raise TooManyTies: if more than max_states partial transforms tie
+    """
+    size = len(b)
+    box = box_size(b)
+    grids = [[list(row) for row in b], transposed(b)]
+    cache = {}
+
+    # first row: the row and the order of the columns, one column at a time; the digits of a row are all different,
+    # so the relabeled row only depends on where its empty squares are, and the digits are labeled afterwards
+    states = [[t, (r,), ()] for t in range(2) for r in range(size)]  # [transpose, rows, cols]
+    first = []
+    for _ in range(size):
+        best = 1
+        kept = []
+        for t, rows, cols in states:
+            row = grids[t][rows[0]]
+            for c in allowed(cols, box, size, cache):
+                value = 1 if row[c] else 0
+                if value < best:
+                    best = value
+                    kept = []
+                if value == best:
+                    kept.append([t, rows, cols + (c,)])
+                    if len(kept) > max_states:
+                        raise TooManyTies()
+        states = kept
+        first.append(best)
+    label = 1
+    for j in range(size):
+        if first[j]:
+            first[j] = label
+            label += 1
+    canonical = [first]
+    labeled = []  # [transpose, rows, cols, digits, next label]
+    for t, rows, cols in states:
+        digits = [0] * (size + 1)
+        row = grids[t][rows[0]]
+        for j, c in enumerate(cols):
+            if row[c]:
+                digits[row[c]] = first[j]
+        labeled.append([t, rows, cols, digits, label])
+    states = labeled
+
+    # other rows: the columns are fixed, keep the states whose next row is the smallest; a candidate row stops
+    # being relabeled as soon as it is larger than the best row so far
+    for _ in range(1, size):
+        best = None
+        kept = []
+        for t, rows, cols, digits, label in states:
+            grid = grids[t]
+            for r in allowed(rows, box, size, cache):
+                row = grid[r]
+                new_digits = digits
+                new_label = label
+                values = []
+                smaller = best is None
+                for j, c in enumerate(cols):
+                    num = row[c]
+                    value = new_digits[num]
+                    if num and not value:
+                        if new_digits is digits:
+                            new_digits = digits[:]
+                        value = new_digits[num] = new_label
+                        new_label += 1
+                    if not smaller:
+                        if value > best[j]:
+                            break
+                        smaller = value < best[j]
+                    values.append(value)
+                else:
+                    if smaller:
+                        best = values
+                        kept = []
+                    kept.append([t, rows + (r,), cols, new_digits, new_label])
+                    if len(kept) > max_states:
+                        raise TooManyTies()
+        states = kept
+        canonical.append(best)
+
+    t, rows, cols, digits, label = states[0]
+    digits = list(digits)
+    for num in range(1, size + 1):  # digits missing from the board take the remaining labels in order
+        if not digits[num]:
+            digits[num] = label
+            label += 1
+    return canonical, Transform(bool(t), list(rows), list(cols), digits)
+
+
+def canonical_key(b):
+    """
+    :param b: board (not modified)
+    :return: a line (board_to_line) of the canonical board, the same for every board of a class
+    :raise TooManyTies: if the board ties on too many transforms (see canonicalize)
+    """
+    return board_to_line(canonicalize(b)[0])
+
+
+def dedup(items, get_board=None):
+    """
+    keep one board of every class (a board that ties on too many transforms is only compared as it is: it is kept
+    unless the same board, or the canonical board of its class, was seen before)
+    :param items: iterable of boards, or of items holding a board
+    :param get_board: function returning the board of an item, None if the items are boards
+    :return: a generator of the items whose class was not seen before, in order
+    """
+    seen = set()
+    for item in items:
+        b = item if get_board is None else get_board(item)
+        try:
+            key = canonical_key(b)
+        except TooManyTies:
+            key = board_to_line(b)  # the canonical board is in the class too, so a match is still a duplicate
+        if key not in seen:
+            seen.add(key)
+            yield item
+
+
+class ClassSolveCache:
+    """
+    Class used to solve boards once per class: the canonical board is solved and its solution is mapped back
+    through the transform of every board of the class
+    """
+
+    def __init__(self):
+        self.solutions = {}  # canonical key -> solution of the canonical board, None if it has none
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0  # boards solved without the cache because they tie on too many transforms
+
+    def solve(self, b, strategy=None):
+        """
+        solve the given sudoku board, reusing the solution of an isomorphic board
+        Note: this function will modify the board
+        :param b: board
+        :param strategy: strategy of solver.solve for the boards not seen before
+        :return: IF the board is solvable:
+                    return True
+                ELSE:
+                    return False
+        """
+        try:
+            canonical, transform = canonicalize(b)
+        except TooManyTies:
+            self.uncached += 1
+            return solve(b, strategy)
+        key = board_to_line(canonical)
+        if key in self.solutions:
+            self.hits += 1
+        else:
+            self.misses += 1
+            solved = solve(canonical, strategy)
+            self.solutions[key] = [row[:] for row in canonical] if solved else None
+        solution = self.solutions[key]
+        if solution is None:
+            return False
+        solution = transform.invert(solution)
+        if isinstance(b, Board):
+            b.update(solution)
+        else:
+            for r in range(len(b)):
+                b[r][:] = solution[r]
+        return True
@@ -0,0 +1,302 @@
+"""
+Sudoku Solver using Dancing Links (Algorithm X)
+
+The board is mapped to the exact-cover matrix with 729 rows (one per square and digit) and 324 columns
+(every square holds a digit, every row/column/box holds every digit once) for a 9x9 board,
+size ** 3 rows and 4 * size ** 2 columns for the other sizes.
+The matrix is built once per process and board size, and each puzzle is solved by covering the rows of its given
+numbers, searching, and uncovering everything again so that the matrix can be reused for the next puzzle.
+"""
+
+from solver import box_size
+
+
+class ExactCoverMatrix:
+    """
+    Class used to store the toroidal doubly linked lists of the Sudoku exact-cover matrix in flat lists
+    (node 0 is the root, nodes 1-324 are the column headers on a 9x9 board, the remaining nodes are the 1s)
+    """
+
+    def __init__(self, box=3):
+        """
+        :param box: box size of the boards solved with this matrix
+        """
+        self.box = box
+        self.size = box * box
+        columns = 4 * self.size ** 2
+        rows = self.size ** 3
+        size = 1 + columns + rows * 4
+        self.left = [0] * size
+        self.right = [0] * size
+        self.up = list(range(size))
+        self.down = list(range(size))
+        self.column = [0] * size  # column header of each node
+        self.row_id = [-1] * size  # matrix row of each node
+        self.count = [0] * (1 + columns)  # number of nodes left in each column
+        self.row_node = [0] * rows  # first node of each matrix row
+
+        # link root and column headers
+        for i in range(1 + columns):
+            self.left[i] = i - 1
+            self.right[i] = i + 1
+        self.left[0] = columns
+        self.right[columns] = 0
+
+        node = columns + 1
+        for row_id in range(rows):
+            row, col, num = self.square_of(row_id)
+            first = node
+            for c in columns_of(row, col, num, box):
+                header = c + 1
+                self.column[node] = header
+                self.row_id[node] = row_id
+                # append node at the bottom of its column
+                self.up[node] = self.up[header]
+                self.down[node] = header
+                self.down[self.up[header]] = node
+                self.up[header] = node
+                self.count[header] += 1
+                # append node at the end of its row
+                self.left[node] = node - 1 if node != first else node
+                self.right[node] = first
+                if node != first:
+                    self.right[node - 1] = node
+                    self.left[first] = node
+                node += 1
+            self.row_node[row_id] = first
+
+    def row_of(self, row, col, num):
+        """
+        get the matrix row placing a digit in a square
+        :param num: digit - 1
+        :return: an integer
+        """
+        return (row * self.size + col) * self.size + num
+
+    def square_of(self, row_id):
+        """
+        undo row_of
+        :return: [row, col, digit - 1]
+        """
+        return [row_id // (self.size * self.size), (row_id // self.size) % self.size, row_id % self.size]
+
+    def cover(self, c):
+        """
+        remove column c from the header list and every row using column c from the other columns
+        :param c: column header
+        """
+        left, right, up, down, column, count = self.left, self.right, self.up, self.down, self.column, self.count
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                count[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, c):
+        """
+        undo cover(c)
+        :param c: column header
+        """
+        left, right, up, down, column, count = self.left, self.right, self.up, self.down, self.column, self.count
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                count[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    def is_covered(self, c):
+        """
+        check if column c has been covered
+        :param c: column header
+        :return: True if covered, False otherwise
+        """
+        return self.right[self.left[c]] != c
+
+    def select(self, row_id):
+        """
+        put a matrix row in the solution by covering all of its columns
+        :param row_id: matrix row
+        :return: IF the row does not conflict with the rows already selected:
+                    return True
+                ELSE (nothing is covered):
+                    return False
+        """
+        first = self.row_node[row_id]
+        j = first
+        while True:
+            if self.is_covered(self.column[j]):
+                return False
+            j = self.right[j]
+            if j == first:
+                break
+        while True:
+            self.cover(self.column[j])
+            j = self.right[j]
+            if j == first:
+                break
+        return True
+
+    def deselect(self, row_id):
+        """
+        undo select(row_id)
+        :param row_id: matrix row
+        """
+        first = self.row_node[row_id]
+        j = self.left[first]
+        while True:
+            self.uncover(self.column[j])
+            if j == first:
+                break
+            j = self.left[j]
+
+    def search(self, solution, limit, on_solution):
+        """
+        Algorithm X: find exact covers of the remaining columns, always branching on the column with the fewest rows
+        :param solution: list of selected matrix rows (used as a stack)
+        :param limit: stop after this many solutions (None for no limit)
+        :param on_solution: called with the solution stack every time a solution is found
+        :return: number of solutions found
+        """
+        right, down, column, count = self.right, self.down, self.column, self.count
+        if right[0] == 0:  # base case: every column is covered
+            on_solution(solution)
+            return 1
+
+        # choose the column with the fewest rows
+        c = right[0]
+        best = c
+        while c != 0:
+            if count[c] < count[best]:
+                best = c
+                if count[c] <= 1:
+                    break
+            c = right[c]
+        c = best
+        if count[c] == 0:
+            return 0
+
+        found = 0
+        self.cover(c)
+        r = down[c]
+        while r != c:
+            solution.append(self.row_id[r])
+            j = right[r]
+            while j != r:
+                self.cover(column[j])
+                j = right[j]
+
+            found += self.search(solution, None if limit is None else limit - found, on_solution)
+
+            j = self.left[r]
+            while j != r:
+                self.uncover(column[j])
+                j = self.left[j]
+            solution.pop()
+            if limit is not None and found >= limit:
+                break
+            r = down[r]
+        self.uncover(c)
+        return found
+
+
+def columns_of(row, col, num, box=3):
+    """
+    get the 4 matrix columns covered by placing a digit in a square
+    :param row: row of square
+    :param col: column of square
+    :param num: digit - 1 (0-8 on a 9x9 board)
+    :param box: box size of the board
+    :return: [square column, row-digit column, column-digit column, box-digit column]
+    """
+    size = box * box
+    cells = size * size
+    box_index = (row // box) * box + col // box
+    return [row * size + col, cells + row * size + num, cells * 2 + col * size + num,
+            cells * 3 + box_index * size + num]
+
+
+_matrices = {}
+
+
+def get_matrix(box=3):
+    """
+    get the exact-cover matrix of this process for a board size, building it on first use
+    :param box: box size of the board
+    :return: ExactCoverMatrix
+    """
+    if box not in _matrices:
+        _matrices[box] = ExactCoverMatrix(box)
+    return _matrices[box]
+
+
+def run(b, limit, on_solution):
+    """
+    cover the given numbers of the board, search, then restore the matrix
+    :param b: board (not modified)
+    :param limit: stop after this many solutions (None for no limit)
+    :param on_solution: called with the list of selected matrix rows for every solution
+    :return: number of solutions found
+    """
+    matrix = get_matrix(box_size(b))
+    selected = []
+    found = 0
+    consistent = True
+    for r in range(matrix.size):
+        for c in range(matrix.size):
+            if b[r][c] != 0:
+                row_id = matrix.row_of(r, c, b[r][c] - 1)
+                if not matrix.select(row_id):
+                    consistent = False
+                    break
+                selected.append(row_id)
+        if not consistent:
+            break
+
+    if consistent:
+        found = matrix.search([], limit, on_solution)
+
+    for row_id in reversed(selected):
+        matrix.deselect(row_id)
+    return found
+
+
+def solve(b):
+    """
+    solve the given sudoku board using Dancing Links
+    Note: this function will modify the board
+    :param b: board
+    :return: IF the board is solvable:
+                return True
+            ELSE:
+                return False
+    """
+    matrix = get_matrix(box_size(b))
+
+    def fill(solution):
+        for row_id in solution:
+            row, col, num = matrix.square_of(row_id)
+            b[row][col] = num + 1
+
+    return run(b, 1, fill) == 1
+
+
+def count_solutions(b, limit=None):
+    """
+    count the solutions of the given sudoku board
+    :param b: board (not modified)
+    :param limit: stop counting after this many solutions (None to count all of them)
+    :return: number of solutions, at most limit
+    """
+    return run(b, limit, lambda solution: None)
@@ -1,103 +1,289 @@
 """
 Sudoku Generator
+
+Every board is generated from its own random.Random seeded with a seed of the board, so a board is identified by
+its puzzle id (generator version, level, box size and seed) and regenerate() builds it again from the id.
 """
 
 import random
-import copy
+import time
+
+from grader import GUESS_SCORE, grade
+from solver import Board, Constraints, SearchStats, box_size, count_solutions, get_peers, get_strategy, run_search
 
-from solver import solve, is_valid
+# search nodes allowed for a uniqueness check on boards larger than 9x9: a square whose check needs more stays filled,
+# which keeps the solution unique and bounds the time spent on the hardest proofs
+LARGE_BOARD_BUDGET = 100
 
-# generate a list containing 1-9
-arr = []
-for i in range(1, 10):
-    arr.append(i)
+# difficulty levels, easiest first: the index of a level is stored in bank files and mixed into batch seeds, so
+# only append to this list
+LEVELS = ["Easy", "Medium", "Hard"]
+# grader scores of the 9x9 levels: Easy needs only singles, Medium locked candidates, pairs or naked triples,
+# Hard x-wings, hidden triples or swordfish; boards needing guesses (grader.GUESS_SCORE) are never generated
+LEVEL_SCORES = {"Easy": [1.0, 1.2], "Medium": [2.0, 3.6], "Hard": [3.8, 4.5]}
+# completed boards tried before giving up on the score band and returning the hardest board tried
+GRADED_ATTEMPTS = 20
+# version of the generation algorithm, part of every puzzle id: increase it whenever a change makes the same seed
+# generate a different board, so that old ids are rejected instead of giving another board
+GENERATOR_VERSION = 2
 
 
-def fill_diagonal(b):
+def fill_diagonal(b, rng=random):
     """
-    randomly fill a diagonal of 3x3 boxes
+    randomly fill a diagonal of boxes (3x3 boxes on a 9x9 board)
     Note: this function will modify the board
     :param b: board
+    :param rng: random.Random (or the random module) used to shuffle the digits
     """
-    for i in range(3):
-        random.shuffle(arr)
+    box = box_size(b)
+    arr = list(range(1, len(b) + 1))  # digits of the board
+    for i in range(box):
+        rng.shuffle(arr)
         p = 0
-        for j in range(i * 3, i * 3 + 3):
-            for k in range(i * 3, i * 3 + 3):
+        for j in range(i * box, i * box + box):
+            for k in range(i * box, i * box + box):
                 b[j][k] = arr[p]
                 p += 1
 
 
-def fill_correct_diagonal(b):
+class PuzzleRecord:
+    """
+    Class used to return a generated board together with its solution and how it was generated
+    """
+
+    def __init__(self, puzzle, solution, level, seed=None, seconds=0.0, nodes=0):
+        """
+        :param puzzle: unsolved board as a list of lists
+        :param solution: solved board as a list of lists
+        :param level: difficulty level
+        :param seed: seed the board was generated from, None for a board that was not generated (from a bank)
+        :param seconds: time spent generating
+        :param nodes: search nodes spent filling the board and checking uniqueness (0 for a board from a bank)
+        """
+        self.puzzle = puzzle
+        self.solution = solution
+        self.level = level
+        self.seed = seed
+        self.puzzle_id = None if seed is None else puzzle_id(seed, level, box_size(puzzle))
+        self.clues = sum(1 for row in puzzle for num in row if num != 0)
+        self.seconds = seconds
+        self.nodes = nodes
+
+    def to_dict(self):
+        """
+        :return: a dict of the record with the boards as lists that can be converted to JSON
+        """
+        return {"puzzle": [list(row) for row in self.puzzle], "solution": [list(row) for row in self.solution],
+                "level": self.level, "seed": self.seed, "id": self.puzzle_id, "clues": self.clues,
+                "seconds": self.seconds, "nodes": self.nodes}
+
+
+def solve_counted(b, stats=None):
+    """
+    solve the board with the default strategy of its size, adding the nodes of the search to stats
+    (solve would trace the search when given stats, timing every node)
+    Note: this function will modify the board
+    :param b: board
+    :param stats: SearchStats whose nodes are increased by the nodes of this search, None to not count them
+    :return: True if the board is solved, False otherwise
+    """
+    constraints = Constraints(b)
+    solved = constraints.consistent and run_search(constraints, get_strategy(None, len(b)))
+    if stats is not None:
+        stats.nodes += constraints.nodes
+    if solved and isinstance(b, Board):
+        b.update(constraints.board)
+    return solved
+
+
+def fill_correct_diagonal(b, stats=None, rng=random):
     """
     try to solve the board having a randomly filled diagonal of 3x3 boxes to GENERATE a complete sudoku board
     Note: this function will modify the board
     :param b: board
+    :param stats: SearchStats whose nodes count the nodes of the searches, None to not count them
+    :param rng: random.Random (or the random module) used to fill the diagonal
     """
-    fill_diagonal(b)
+    fill_diagonal(b, rng)
     while True:
-        if solve(b):
+        if solve_counted(b, stats):
             break
         else:
-            fill_diagonal(b)
+            fill_diagonal(b, rng)
             continue
 
 
-def clear_square(b, num):
+def forced(b, peers):
+    """
+    check if the digits of its peers leave a single digit for a square (a naked single)
+    :param b: board
+    :param peers: [row, col] of the peers of the square (solver.get_peers)
+    :return: True if the peers hold every digit but one, False otherwise
+    """
+    digits = set(b[r][c] for r, c in peers)
+    digits.discard(0)
+    return len(digits) == len(b) - 1
+
+
+def clear_square(b, num, band=None, stats=None, rng=random):
     """
     clear some squares based on the given num to generate an unsolved board.
     Note: this function will modify the board
     :param b:board
-    :param num:number of squares to be cleared
+    :param num:number of squares to be cleared (fewer are cleared if no other square keeps the solution unique)
+    :param band:optional [lowest, highest] grader score: every removal is graded (but for squares their peers still
+                force, which the grader fills back with a single), a removal that makes the board harder than highest
+                (e.g. needing guesses) is put back, and once num squares are cleared squares keep being cleared until
+                the score reaches lowest
+    :param stats:optional SearchStats whose nodes count the nodes of the uniqueness checks
+    :param rng:random.Random (or the random module) used to choose the squares
     :return:an unsolved board
     """
-    while num > 0:
-        row = random.randrange(0, 9)
-        col = random.randrange(0, 9)
-        if b[row][col] != 0:
-            if check_unique_sol(b, row, col):
-                b[row][col] = 0
+    board = b.to_list() if isinstance(b, Board) else b  # every check searches its board, a Board would be copied
+    # visit every square once in random order: a square whose removal breaks uniqueness can never be removed later,
+    # since clearing more squares only adds solutions
+    size = len(board)
+    positions = [[row, col] for row in range(size) for col in range(size)]
+    rng.shuffle(positions)
+    peers = get_peers(box_size(board))
+    score = None
+    for row, col in positions:
+        if num <= 0 and (band is None or (score is not None and score >= band[0])):
+            break
+        if board[row][col] != 0:
+            if check_unique_sol(board, row, col, stats):
+                value = board[row][col]
+                board[row][col] = 0
+                if band is not None and not (score is not None and forced(board, peers[row * size + col])):
+                    new_score = grade(board, band[1])["score"]
+                    if new_score > band[1]:  # too hard: keep the square
+                        board[row][col] = value
+                        continue
+                    score = new_score
                 num -= 1
+    if board is not b:
+        b.update(board)
     return b
 
 
-def generator(level):
+def generate(level, bank=None, box=3, seed=None):
+    """
+    generate an unsolved board based on the given level, keeping the completed board it was cleared from
+    :param level: selected Sudoku game difficulty
+    :param bank: optional bank.PuzzleBank to draw a 9x9 board from, the board is generated if the bank has none
+    :param box: box size of the board (3 for 9x9, 4 for 16x16, 5 for 25x25)
+    :param seed: seed of the board, the same seed, level and box size always give the same board
+                 (None for a random seed)
+    :return: a PuzzleRecord whose puzzle matches the required difficulty, the boards as lists of lists
+    """
+    if bank is not None and box == 3:
+        record = bank.random(level)
+        if record is not None:
+            return PuzzleRecord(record["puzzle"], record["solution"], level)
+
+    if seed is None:
+        seed = random.randrange(1 << 32)
+    rng = random.Random(seed)  # not the shared module state, which other threads also draw from
+    start = time.perf_counter()
+    stats = SearchStats()
+    size = box * box
+    # the score bands are calibrated on 9x9 boards, the other sizes only use the number of blanks
+    band = LEVEL_SCORES.get(level) if box == 3 else None
+    best = None  # [score, board, solution] of the hardest attempt, every attempt is at most as hard as the band
+    for _ in range(GRADED_ATTEMPTS if band is not None else 1):
+        game_board = [[0 for _ in range(size)] for _ in range(size)]  # create an empty board
+        fill_correct_diagonal(game_board, stats, rng)  # create a randomly generated and completed board
+        solution = [row[:] for row in game_board]
+
+        # blanks on a 9x9 board, the same share of the squares on the other sizes
+        level_num = 0
+        if level == "Easy":  # easy 35-41 blank
+            level_num = rng.randrange(35 * size * size // 81, 41 * size * size // 81 + 1)
+        elif level == "Medium":  # medium 42-48 blank
+            level_num = rng.randrange(42 * size * size // 81, 48 * size * size // 81 + 1)
+        elif level == "Hard":  # hard 49-55 blank
+            level_num = rng.randrange(49 * size * size // 81, 55 * size * size // 81 + 1)
+
+        clear_square(game_board, level_num, band, stats, rng)
+        if band is None:
+            break
+        score = grade(game_board, band[1])["score"]
+        if score <= band[1] and (best is None or score > best[0]):
+            best = [score, game_board, solution]
+        if score >= band[0]:
+            break
+    if best is not None:
+        game_board, solution = best[1], best[2]
+    return PuzzleRecord(game_board, solution, level, seed, time.perf_counter() - start, stats.nodes)
+
+
+def generator(level, bank=None, box=3):
     """
     generate an unsolved board based on the given level
     :param level: selected Sudoku game difficulty
-    :return: an unsolved board that matches the required difficulty
+    :param bank: optional bank.PuzzleBank to draw a 9x9 board from, the board is generated if the bank has none
+    :param box: box size of the board (3 for 9x9, 4 for 16x16, 5 for 25x25)
+    :return: an unsolved board as a list of lists that matches the required difficulty
     """
+    return generate(level, bank, box).puzzle
 
-    game_board = [[0 for _ in range(9)] for _ in range(9)]  # create an empty board
-    fill_correct_diagonal(game_board)  # create a randomly generated and completed board
-    level_num = 0
-    if level == "Easy":  # easy 35-41 blank
-        level_num = random.randrange(35, 42)
-    elif level == "Medium":  # medium 42-48 blank
-        level_num = random.randrange(42, 49)
-    elif level == "Hard":  # hard 49-55 blank
-        level_num = random.randrange(49, 56)
 
-    return clear_square(game_board, level_num)
+def puzzle_id(seed, level, box=3):
+    """
+    build the id of a generated board
+    :param seed: seed the board was generated from
+    :param level: difficulty level
+    :param box: box size of the board
+    :return: a string such as "2-Hard-9-123456" (generator version, level, board size, seed)
+    """
+    return "{}-{}-{}-{}".format(GENERATOR_VERSION, level, box * box, seed)
+
+
+def parse_puzzle_id(pid):
+    """
+    split a puzzle id built by puzzle_id
+    :param pid: puzzle id
+    :return: [seed, level, box]
+    :raise ValueError: if the id is malformed or comes from another version of the generator
+    """
+    parts = pid.split("-")
+    if len(parts) != 4 or not all(part.isdigit() for part in [parts[0], parts[2], parts[3]]):
+        raise ValueError("malformed puzzle id: {!r}".format(pid))
+    version, level, size, seed = int(parts[0]), parts[1], int(parts[2]), int(parts[3])
+    if version != GENERATOR_VERSION:
+        raise ValueError("puzzle id {!r} comes from generator version {}, this is version {}".format(
+            pid, version, GENERATOR_VERSION))
+    box = int(round(size ** 0.5))
+    if level not in LEVELS or box < 2 or box * box != size:
+        raise ValueError("malformed puzzle id: {!r}".format(pid))
+    return seed, level, box
+
+
+def regenerate(pid):
+    """
+    generate the board of a puzzle id again
+    :param pid: puzzle id of a generated board (PuzzleRecord.puzzle_id)
+    :return: the PuzzleRecord, the same board and solution as when the id was made
+    :raise ValueError: if the id is malformed or comes from another version of the generator
+    """
+    seed, level, box = parse_puzzle_id(pid)
+    return generate(level, box=box, seed=seed)
 
 
-def check_unique_sol(b, row, col):
+def check_unique_sol(b, row, col, stats=None):
     """
     check if the board has a unique solution after clearing the square value at position [row, col].
     :param b: board
     :param row: row of square
     :param col: column of square
+    :param stats: optional SearchStats whose nodes count the nodes of the check
     :return: IF the board has a unique solution:
                 RETURN TRUE
-             ELSE:
+             ELSE (or if proving it on a board larger than 9x9 needs more than LARGE_BOARD_BUDGET nodes):
                 FALSE
     """
-    for i in range(1, 10):
-        temp = copy.deepcopy(b)
-        if temp[row][col] != i:
-            temp[row][col] = 0
-            if is_valid(b, i, [row, col]):
-                temp[row][col] = i
-                if solve(temp):
-                    return False
-    return True
+    num = b[row][col]
+    b[row][col] = 0
+    unique = count_solutions(b, 2, None if len(b) <= 9 else LARGE_BOARD_BUDGET, stats) == 1
+    b[row][col] = num
+    return unique
@@ -0,0 +1,339 @@
+"""
+Sudoku Grader
+
+Solve a board the way a person would, always using the easiest technique that makes progress,
+and grade it by the hardest technique it needed.
+A board that no technique can finish needs guessing and gets GUESS_SCORE.
+"""
+
+import itertools
+
+from solver import Constraints, box_size, get_peers, get_units, popcount
+
+GUESS_SCORE = 10.0
+
+
+class Candidates:
+    """
+    Class used to keep the candidate mask of every square of a board, updated as digits are placed and eliminated
+    """
+
+    def __init__(self, b):
+        """
+        :param b: board (not modified, a copy is kept)
+        """
+        self.board = [list(row) for row in b]
+        self.size = len(b)
+        self.box = box_size(b)
+        self.units = get_units(self.box)
+        self.peers = get_peers(self.box)
+        constraints = Constraints(self.board)
+        self.consistent = constraints.consistent
+        self.masks = [[constraints.candidates(r, c) if self.board[r][c] == 0 else 0 for c in range(self.size)]
+                      for r in range(self.size)]
+
+    def place(self, row, col, num):
+        """
+        place num in the square at [row, col] and remove it from the candidates of the peers
+        """
+        self.board[row][col] = num
+        self.masks[row][col] = 0
+        bit = ~(1 << (num - 1))
+        for r, c in self.peers[row * self.size + col]:
+            self.masks[r][c] &= bit
+
+    def remove(self, row, col):
+        """
+        clear the square at [row, col] and compute the candidates of the square and of its peers again from the rules
+        (digits eliminated from them by techniques come back)
+        """
+        self.board[row][col] = 0
+        for r, c in [[row, col]] + self.peers[row * self.size + col]:
+            if self.board[r][c] == 0:
+                used = 0
+                for pr, pc in self.peers[r * self.size + c]:
+                    if self.board[pr][pc] != 0:
+                        used |= 1 << (self.board[pr][pc] - 1)
+                self.masks[r][c] = ((1 << self.size) - 1) & ~used
+
+    def eliminate(self, row, col, num):
+        """
+        remove num from the candidates of the square at [row, col]
+        """
+        self.masks[row][col] &= ~(1 << (num - 1))
+
+    def has(self, row, col, num):
+        """
+        check if num is a candidate of the square at [row, col]
+        """
+        return bool(self.masks[row][col] & (1 << (num - 1)))
+
+    def digits(self, row, col):
+        """
+        get the candidates of the square at [row, col]
+        :return: a list of digits
+        """
+        mask = self.masks[row][col]
+        return [num for num in range(1, self.size + 1) if mask & (1 << (num - 1))]
+
+    def solved(self):
+        """
+        :return: True if every square is filled
+        """
+        return all(num != 0 for row in self.board for num in row)
+
+    def broken(self):
+        """
+        :return: True if an empty square has no candidate left
+        """
+        return any(self.board[r][c] == 0 and self.masks[r][c] == 0
+                   for r in range(self.size) for c in range(self.size))
+
+
+class Step:
+    """
+    Class used to describe one deduction: the technique, the squares it is based on,
+    and the digits it places or eliminates
+    """
+
+    def __init__(self, technique, cells, placements=None, eliminations=None):
+        """
+        :param technique: name of the technique
+        :param cells: list of [row, col] the deduction is based on
+        :param placements: list of [row, col, num] to place
+        :param eliminations: list of [row, col, num] to remove from the candidates
+        """
+        self.technique = technique
+        self.cells = cells
+        self.placements = placements or []
+        self.eliminations = eliminations or []
+
+    def apply(self, candidates):
+        """
+        apply the deduction
+        :param candidates: Candidates to update
+        """
+        for row, col, num in self.placements:
+            candidates.place(row, col, num)
+        for row, col, num in self.eliminations:
+            candidates.eliminate(row, col, num)
+
+    def describe(self):
+        """
+        :return: a short text such as "hidden single: 5 at r3c4"
+        """
+        if self.placements:
+            row, col, num = self.placements[0]
+            return "{}: {} at r{}c{}".format(self.technique, num, row + 1, col + 1)
+        removed = ", ".join("{} from r{}c{}".format(num, row + 1, col + 1) for row, col, num in self.eliminations)
+        return "{}: remove {}".format(self.technique, removed)
+
+
+def empty_squares(candidates, squares):
+    """
+    get the empty squares of a unit
+    :param squares: list of [row, col, box index]
+    :return: list of [row, col]
+    """
+    return [[row, col] for row, col, box in squares if candidates.board[row][col] == 0]
+
+
+def naked_single(candidates):
+    """
+    a square with a single candidate
+    """
+    for row in range(candidates.size):
+        for col in range(candidates.size):
+            mask = candidates.masks[row][col]
+            if candidates.board[row][col] == 0 and mask and mask & (mask - 1) == 0:
+                return Step("naked single", [[row, col]], placements=[[row, col, mask.bit_length()]])
+    return None
+
+
+def hidden_single(candidates):
+    """
+    a digit with a single possible square in a row, a column or a box
+    """
+    for kind, index, squares in candidates.units:
+        cells = empty_squares(candidates, squares)
+        for num in range(1, candidates.size + 1):
+            places = [[row, col] for row, col in cells if candidates.has(row, col, num)]
+            if len(places) == 1:
+                row, col = places[0]
+                return Step("hidden single", cells, placements=[[row, col, num]])
+    return None
+
+
+def locked_candidates(candidates):
+    """
+    pointing: the candidates of a digit in a box all lie in one row or column, so the digit leaves the rest of it;
+    claiming: the candidates of a digit in a row or column all lie in one box, so the digit leaves the rest of the box
+    """
+    box = candidates.box
+    units = candidates.units
+    for kind, index, squares in units:
+        cells = empty_squares(candidates, squares)
+        for num in range(1, candidates.size + 1):
+            places = [[row, col] for row, col in cells if candidates.has(row, col, num)]
+            if len(places) < 2:
+                continue
+            if kind == 2:
+                # pointing: the other unit is the row or the column shared by every place
+                targets = []
+                if len(set(row for row, col in places)) == 1:
+                    targets.append(units[places[0][0] * 3])
+                if len(set(col for row, col in places)) == 1:
+                    targets.append(units[places[0][1] * 3 + 1])
+            elif len(set((row // box) * box + col // box for row, col in places)) == 1:
+                row, col = places[0]
+                targets = [units[((row // box) * box + col // box) * 3 + 2]]  # claiming: the shared box
+            else:
+                targets = []
+            for target in targets:
+                eliminations = [[row, col, num] for row, col in empty_squares(candidates, target[2])
+                                if [row, col] not in places and candidates.has(row, col, num)]
+                if eliminations:
+                    return Step("locked candidates", places, eliminations=eliminations)
+    return None
+
+
+def naked_subset(candidates, k, name):
+    """
+    k squares of a unit whose candidates are only k digits: those digits leave the other squares of the unit
+    """
+    for kind, index, squares in candidates.units:
+        cells = empty_squares(candidates, squares)
+        small = [[row, col] for row, col in cells if 2 <= popcount(candidates.masks[row][col]) <= k]
+        for subset in itertools.combinations(small, k):
+            union = 0
+            for row, col in subset:
+                union |= candidates.masks[row][col]
+            if popcount(union) != k:
+                continue
+            eliminations = [[row, col, num] for row, col in cells if [row, col] not in subset
+                            for num in candidates.digits(row, col) if union & (1 << (num - 1))]
+            if eliminations:
+                return Step(name, list(subset), eliminations=eliminations)
+    return None
+
+
+def hidden_subset(candidates, k, name):
+    """
+    k digits of a unit that only fit in the same k squares: the other digits leave those squares
+    """
+    for kind, index, squares in candidates.units:
+        cells = empty_squares(candidates, squares)
+        places = {}
+        for num in range(1, candidates.size + 1):
+            where = [i for i, (row, col) in enumerate(cells) if candidates.has(row, col, num)]
+            if 2 <= len(where) <= k:
+                places[num] = where
+        for digits in itertools.combinations(sorted(places), k):
+            where = set()
+            for num in digits:
+                where.update(places[num])
+            if len(where) != k:
+                continue
+            subset = [cells[i] for i in sorted(where)]
+            eliminations = [[row, col, num] for row, col in subset
+                            for num in candidates.digits(row, col) if num not in digits]
+            if eliminations:
+                return Step(name, subset, eliminations=eliminations)
+    return None
+
+
+def fish(candidates, k, name):
+    """
+    k rows where a digit only fits in the same k columns: the digit leaves those columns in the other rows
+    (and the same with rows and columns swapped); X-Wing for k = 2, Swordfish for k = 3
+    """
+    size = candidates.size
+    for num in range(1, size + 1):
+        for by_rows in [True, False]:
+            lines = {}
+            for i in range(size):
+                where = [j for j in range(size)
+                         if (candidates.has(i, j, num) if by_rows else candidates.has(j, i, num))
+                         and candidates.board[i if by_rows else j][j if by_rows else i] == 0]
+                if 2 <= len(where) <= k:
+                    lines[i] = where
+            for base in itertools.combinations(sorted(lines), k):
+                cover = set()
+                for i in base:
+                    cover.update(lines[i])
+                if len(cover) != k:
+                    continue
+                eliminations = []
+                for i in range(size):
+                    if i in base:
+                        continue
+                    for j in cover:
+                        row, col = (i, j) if by_rows else (j, i)
+                        if candidates.board[row][col] == 0 and candidates.has(row, col, num):
+                            eliminations.append([row, col, num])
+                if eliminations:
+                    cells = [[i, j] if by_rows else [j, i] for i in base for j in lines[i]]
+                    return Step(name, cells, eliminations=eliminations)
+    return None
+
+
+# techniques from the easiest to the hardest: [name, function, score]
+TECHNIQUES = [
+    ["hidden single", hidden_single, 1.0],
+    ["naked single", naked_single, 1.2],
+    ["locked candidates", locked_candidates, 2.0],
+    ["naked pair", lambda cand: naked_subset(cand, 2, "naked pair"), 3.0],
+    ["hidden pair", lambda cand: hidden_subset(cand, 2, "hidden pair"), 3.4],
+    ["naked triple", lambda cand: naked_subset(cand, 3, "naked triple"), 3.6],
+    ["x-wing", lambda cand: fish(cand, 2, "x-wing"), 3.8],
+    ["hidden triple", lambda cand: hidden_subset(cand, 3, "hidden triple"), 4.0],
+    ["swordfish", lambda cand: fish(cand, 3, "swordfish"), 4.5],
+]
+
+
+def next_step(candidates, max_score=None):
+    """
+    find the easiest deduction that makes progress
+    :param candidates: Candidates of the board
+    :param max_score: do not try techniques scored above this (None to try them all)
+    :return: [Step, score] or [None, None] if no technique applies
+    """
+    for name, technique, score in TECHNIQUES:
+        if max_score is not None and score > max_score:
+            break
+        step = technique(candidates)
+        if step is not None:
+            return step, score
+    return None, None
+
+
+def grade(b, max_score=None):
+    """
+    grade a board by the hardest technique needed to solve it
+    :param b: board (not modified)
+    :param max_score: stop as soon as the board needs a technique scored above this, the score is then above
+                      max_score but not exact (None to grade completely)
+    :return: a dict {"score", "solved", "techniques"}: score is the score of the hardest technique
+             (GUESS_SCORE if the techniques cannot finish the board), solved is True if the techniques finished it,
+             techniques maps every technique used to the number of times it was used
+    """
+    candidates = Candidates(b)
+    result = {"score": 0.0, "solved": False, "techniques": {}}
+    if not candidates.consistent:
+        result["score"] = GUESS_SCORE
+        return result
+
+    while not candidates.solved():
+        if candidates.broken():  # the board has no solution
+            result["score"] = GUESS_SCORE
+            return result
+        step, score = next_step(candidates, max_score)
+        if step is None:
+            result["score"] = GUESS_SCORE
+            return result
+        step.apply(candidates)
+        result["score"] = max(result["score"], score)
+        result["techniques"][step.technique] = result["techniques"].get(step.technique, 0) + 1
+
+    result["solved"] = True
+    return result
@@ -0,0 +1,333 @@
+"""
+Parallel Sudoku Solver
+
+Solve a single hard board on every core: the first branching levels of the search are expanded into subproblems,
+one board per combination of digits, and worker processes take them from a shared queue.
+Every worker runs solver.IterativeSolver in slices of SLICE_NODES nodes; between slices it checks whether the search
+was stopped and, if a worker is idle and the queue is empty, gives away the untried digits of its shallowest square
+as new subproblems, so that one long subproblem does not keep the other workers waiting.
+The first solution stops every worker; when counting, every worker counts its own solutions and reports the count
+with each finished subproblem (and every SLICE_NODES nodes when the count has a limit), and the counts are summed.
+The default strategy is "propagate", the same search solver.solve runs on boards larger than 9x9.
+
+usage: python parallel_solve.py 000000012000000003002300400001800005060070800000009000008500000900040500470006000
+       python parallel_solve.py --count --workers 8 <board>
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from solver import Board, Constraints, IterativeSolver, board_to_line, iterative_strategy, line_to_board, \
+    print_board
+
+# subproblems made per worker before the search starts
+SPLIT_FACTOR = 8
+# branching levels expanded at most to make the subproblems
+SPLIT_LEVELS = 4
+# nodes a worker searches between two checks for a stop or an idle worker
+SLICE_NODES = 2048
+
+
+def expand(b, strategy):
+    """
+    fill the forced squares of a board and branch on the next square
+    :param b: board as a list of lists (not modified)
+    :param strategy: Strategy choosing the square and the order of the digits, propagating first if it propagates
+    :return: [children, solution, nodes]: one board per candidate digit of the chosen square, the filled board if
+             no empty square is left (else None), and the number of digits placed
+    """
+    constraints = Constraints([list(row) for row in b])
+    if not constraints.consistent:
+        return [], None, 0
+    trail = []
+    if strategy.propagate and not constraints.propagate(trail):
+        return [], None, len(trail)
+    nodes = len(trail)
+    while True:
+        square = constraints.choose_square(strategy, None)
+        if square is None:
+            return [], constraints.board, nodes
+        row, col, box = square
+        candidates = constraints.candidates(row, col)
+        if candidates == 0:  # dead end
+            return [], None, nodes
+        if candidates & (candidates - 1):
+            break
+        constraints.place(row, col, candidates.bit_length())  # forced square, not a branch
+        nodes += 1
+
+    children = []
+    for num in constraints.order_digits(row, col, candidates, strategy, None):
+        child = [list(line) for line in constraints.board]
+        child[row][col] = num
+        children.append(child)
+    return children, None, nodes + len(children)
+
+
+def split(b, parts, strategy, levels=SPLIT_LEVELS):
+    """
+    expand the first branching levels of the search until there are at least parts subproblems
+    :param b: board (not modified)
+    :param parts: number of subproblems wanted
+    :param strategy: Strategy of the search
+    :param levels: branching levels expanded at most
+    :return: [subproblems, solutions, nodes]: boards left to search in search order, boards solved while splitting,
+             and the number of digits placed
+    """
+    frontier = [[list(row) for row in b]]
+    solutions = []
+    nodes = 0
+    for _ in range(levels):
+        if len(frontier) >= parts:
+            break
+        expanded = []
+        for board in frontier:
+            children, solution, placed = expand(board, strategy)
+            nodes += placed
+            expanded.extend(children)
+            if solution is not None:
+                solutions.append(solution)
+        frontier = expanded
+        if not frontier:
+            break
+    return frontier, solutions, nodes
+
+
+def donate(solver, base):
+    """
+    take the untried digits of the shallowest square of a running search away from it
+    :param solver: IterativeSolver of a subproblem
+    :param base: the subproblem board before the search
+    :return: one board per digit taken, the digits placed above that square and the digit filled in
+    """
+    for i, entry in enumerate(solver.stack[:-1]):  # the deepest square is being searched right now
+        row, col, digits, _ = entry
+        if not digits:
+            continue
+        prefix = [list(line) for line in base]
+        for r, c, _, _ in solver.stack[:i]:
+            prefix[r][c] = solver.constraints.board[r][c]
+        boards = []
+        for num in digits:
+            board = [list(line) for line in prefix]
+            board[row][col] = num
+            boards.append(board)
+        entry[2] = []
+        return boards
+    return []
+
+
+def work(tasks, results, stop, idle, queued, strategy, counting, limit):
+    """
+    body of a worker process: search the subproblems taken from tasks until it gets None
+    :param tasks: queue of subproblems as lines, None to exit
+    :param results: queue of messages to the parent: ["split", lines], ["solution", line], ["count", solutions],
+                    ["done", [nodes, solutions not reported yet]]
+    :param stop: Event set when the search is over
+    :param idle: shared number of workers waiting for a subproblem
+    :param queued: shared number of subproblems in tasks
+    :param strategy: Strategy of the search
+    :param counting: True to count every solution, False to stop at the first
+    :param limit: limit of the count, the count is then reported at most once per SLICE_NODES nodes so the parent
+                  can stop early (None for no limit)
+    """
+    results.cancel_join_thread()  # the parent stops reading once the search is over
+    while True:
+        line = tasks.get()
+        if line is None:
+            return
+        with queued.get_lock():
+            queued.value -= 1
+        with idle.get_lock():
+            idle.value -= 1
+        nodes = 0
+        found = 0  # solutions not reported yet
+        if not stop.is_set():
+            base = line_to_board(line)
+            solver = IterativeSolver([list(row) for row in base], strategy)
+            reported = 0  # solver nodes when the count was last reported
+            while not stop.is_set():
+                status = solver.run(max_nodes=SLICE_NODES)
+                if status == "solved" and counting:
+                    found += 1
+                    solver.next_solution()  # then check for an idle worker as after a slice: slices often end here
+                    status = solver.status
+                if status == "running":
+                    if limit is not None and found and solver.nodes - reported >= SLICE_NODES:
+                        results.put(["count", found])
+                        found = 0
+                        reported = solver.nodes
+                    if idle.value > 0 and queued.value == 0:
+                        boards = donate(solver, base)
+                        if boards:
+                            results.put(["split", [board_to_line(board) for board in boards]])
+                    continue
+                if status == "solved":
+                    results.put(["solution", board_to_line(solver.constraints.board)])
+                break
+            nodes = solver.nodes
+        with idle.get_lock():
+            idle.value += 1
+        results.put(["done", [nodes, found]])
+
+
+def run_parallel(b, workers, strategy, counting, limit, token):
+    """
+    split the board and search the subproblems on worker processes
+    :param b: board (not modified)
+    :param workers: number of worker processes
+    :param strategy: Strategy of the search
+    :param counting: True to count the solutions, False to stop at the first
+    :param limit: stop counting after this many solutions (None to count all of them)
+    :param token: solver.CancelToken to stop the search from another thread, None if it cannot be stopped
+    :return: [first solution or None, number of solutions found, nodes, True if cancelled]
+    """
+    parts, solutions, nodes = split(b, workers * SPLIT_FACTOR, strategy)
+    found = len(solutions)
+    solution = solutions[0] if solutions else None
+    if (not counting and solution is not None) or (limit is not None and found >= limit) or not parts:
+        return solution, found if limit is None else min(found, limit), nodes, False
+
+    context = multiprocessing.get_context()
+    tasks = context.Queue()
+    results = context.Queue()
+    stop = context.Event()
+    idle = context.Value("i", workers)
+    queued = context.Value("i", 0)
+    processes = [context.Process(target=work, daemon=True,
+                                 args=(tasks, results, stop, idle, queued, strategy, counting, limit))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    pending = 0
+    cancelled = False
+    lines = [board_to_line(part) for part in parts]
+    try:
+        while True:
+            if lines:
+                with queued.get_lock():
+                    queued.value += len(lines)
+                pending += len(lines)
+                for line in lines:
+                    tasks.put(line)
+                lines = []
+            if pending == 0:
+                break
+            if token is not None and token.cancelled and not stop.is_set():
+                cancelled = True
+                stop.set()
+            try:
+                kind, value = results.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if kind == "split":
+                lines = value
+            elif kind == "solution":
+                found += 1
+                if solution is None:
+                    solution = line_to_board(value)
+                stop.set()
+            elif kind == "count":
+                found += value
+                if found >= limit:
+                    stop.set()
+            else:
+                pending -= 1
+                nodes += value[0]
+                found += value[1]
+                if limit is not None and found >= limit:
+                    stop.set()
+    finally:
+        stop.set()
+        for _ in processes:
+            tasks.put(None)
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+    return solution, found if limit is None else min(found, limit), nodes, cancelled
+
+
+def parallel_solve(b, workers=None, strategy="propagate", token=None, stats=None):
+    """
+    solve the given sudoku board on a pool of worker processes
+    Note: this function will modify the board
+    :param b: board
+    :param workers: number of worker processes, None for one per core
+    :param strategy: strategy solver.IterativeSolver can run (see solver.iterative_strategy)
+    :param token: solver.CancelToken to stop the search from another thread, None if it cannot be stopped
+    :param stats: solver.SearchStats whose nodes, seconds and solved are updated, None to not record them
+    :return: "solved", "unsolvable" or "cancelled"
+    """
+    start = time.perf_counter()
+    strategy = iterative_strategy(strategy, len(b))
+    solution, found, nodes, cancelled = run_parallel(b, workers or os.cpu_count(), strategy, False, None, token)
+    if solution is not None:
+        if isinstance(b, Board):
+            b.update(solution)
+        else:
+            for r in range(len(b)):
+                b[r][:] = solution[r]
+    if stats is not None:
+        stats.nodes += nodes
+        stats.seconds += time.perf_counter() - start
+        stats.solved = solution is not None
+    if solution is not None:
+        return "solved"
+    return "cancelled" if cancelled else "unsolvable"
+
+
+def parallel_count(b, limit=None, workers=None, strategy="propagate", token=None, stats=None):
+    """
+    count the solutions of the given sudoku board on a pool of worker processes
+    :param b: board (not modified)
+    :param limit: stop counting after this many solutions (None to count all of them)
+    :param workers: number of worker processes, None for one per core
+    :param strategy: strategy solver.IterativeSolver can run (see solver.iterative_strategy)
+    :param token: solver.CancelToken to stop the search from another thread, None if it cannot be stopped
+    :param stats: solver.SearchStats whose nodes and seconds are updated, None to not record them
+    :return: IF the search finished:
+                return the number of solutions, at most limit
+            ELSE (cancelled):
+                return None
+    """
+    start = time.perf_counter()
+    strategy = iterative_strategy(strategy, len(b))
+    solution, found, nodes, cancelled = run_parallel(b, workers or os.cpu_count(), strategy, True, limit, token)
+    if stats is not None:
+        stats.nodes += nodes
+        stats.seconds += time.perf_counter() - start
+    return None if cancelled else found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve one Sudoku board on every core.")
+    parser.add_argument("board", help="the board as a line of 81 characters (0 or . for empty squares)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--strategy", default="propagate", help="a strategy solver.IterativeSolver can run")
+    parser.add_argument("--count", action="store_true", help="count the solutions instead of solving")
+    parser.add_argument("--limit", type=int, help="stop counting after this many solutions")
+    args = parser.parse_args(argv)
+    try:
+        board = line_to_board(args.board)
+        iterative_strategy(args.strategy, len(board))
+    except ValueError as error:
+        parser.error(str(error))
+
+    start = time.perf_counter()
+    if args.count:
+        print(parallel_count(board, args.limit, args.workers, args.strategy))
+    elif parallel_solve(board, args.workers, args.strategy) == "solved":
+        print_board(board)
+    else:
+        print("no solution")
+    print("{:.3f} s".format(time.perf_counter() - start), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
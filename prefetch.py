@@ -0,0 +1,104 @@
+"""
+Sudoku board prefetching
+
+A background thread keeps a queue of ready boards for every level, so a new board can be taken without waiting
+for the generator.
+"""
+
+import queue
+import threading
+
+from generator import LEVELS, generator
+
+
+class Prefetcher:
+    """
+    Class used to keep a queue of generated boards per level topped up by a background thread
+    """
+
+    def __init__(self, depth=2, levels=None, make_board=generator):
+        """
+        :param depth: number of ready boards kept for every level
+        :param levels: list of levels to prefetch, None for every level
+        :param make_board: function generating a board (or a generator.PuzzleRecord) for a given level
+        """
+        self.depth = depth
+        self.levels = LEVELS if levels is None else levels
+        self.make_board = make_board
+        self.queues = {level: queue.Queue(maxsize=depth) for level in self.levels}
+        self.wanted = None  # level asked for while its queue was empty, filled first
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """
+        start the background thread (it stops with the program)
+        """
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="sudoku-prefetch", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        stop the background thread after the board it is generating
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def get(self, level):
+        """
+        take a ready board without waiting
+        :param level: level of the board
+        :return: IF a board is ready:
+                    return the board
+                ELSE:
+                    return None (the level is generated next)
+        """
+        try:
+            board = self.queues[level].get_nowait()
+        except queue.Empty:
+            board = None
+        with self.condition:
+            if board is None:
+                self.wanted = level
+            self.condition.notify()
+        return board
+
+    def next_level(self):
+        """
+        choose the level to generate next
+        :return: IF a queue is not full:
+                    return the wanted level if it is not full, otherwise the level with the fewest ready boards
+                ELSE:
+                    return None
+        """
+        if self.wanted is not None and not self.queues[self.wanted].full():
+            return self.wanted
+        level = min(self.levels, key=lambda lv: self.queues[lv].qsize())
+        if self.queues[level].full():
+            return None
+        return level
+
+    def run(self):
+        """
+        body of the background thread: generate boards until every queue is full, then wait for a board to be taken
+        """
+        while True:
+            with self.condition:
+                level = self.next_level()
+                while self.running and level is None:
+                    self.condition.wait()
+                    level = self.next_level()
+                if not self.running:
+                    return
+
+            board = self.make_board(level)
+
+            with self.condition:
+                self.queues[level].put(board)
+                if self.wanted == level:
+                    self.wanted = None
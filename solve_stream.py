@@ -0,0 +1,170 @@
+"""
+Streaming Sudoku Solver
+
+Read boards as lines of 81 characters ("0" or "." for empty squares) from a file or stdin, solve them on a
+process pool with solver.solve, and write the solutions in the same format.
+Only a bounded number of chunks is in flight at a time, so memory does not grow with the size of the input.
+Lines that cannot be solved are written back unchanged and reported on stderr.
+With --time-limit, a board is given up after that many seconds instead of holding its worker for as long as it takes.
+With --cache, every worker keeps the solutions of the boards it solved last, so repeated boards are not solved again.
+
+usage: python solve_stream.py puzzles.txt > solutions.txt
+       python solve_stream.py --unordered --timing < puzzles.txt > solutions.txt
+       python solve_stream.py --time-limit 0.5 puzzles.txt > solutions.txt
+       python solve_stream.py --cache 4096 puzzles.txt > solutions.txt
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import os
+import sys
+import time
+
+from solver import STRATEGIES, IterativeSolver, board_to_line, enable_solution_cache, iterative_strategy, \
+    line_to_board, solve
+
+
+def solve_chunk(chunk, strategy, time_limit=None):
+    """
+    solve a chunk of lines in a worker process
+    :param chunk: list of [line number, line]
+    :param strategy: name of a strategy in solver.STRATEGIES, None for the default strategy of the board size
+                     ("propagate" on boards larger than 9x9, see solver.get_strategy)
+    :param time_limit: seconds allowed per board (None for no limit), the strategy must then be one that
+                       solver.IterativeSolver can run
+    :return: list of [line number, output line, status, seconds],
+             status is "solved", "unsolvable", "timeout" or "malformed"
+    """
+    results = []
+    for number, line in chunk:
+        start = time.perf_counter()
+        try:
+            board = line_to_board(line)
+        except ValueError:
+            results.append([number, line, "malformed", time.perf_counter() - start])
+            continue
+        if time_limit is None:
+            status = "solved" if solve(board, strategy) else "unsolvable"
+        else:
+            status = IterativeSolver(board, strategy).run(max_seconds=time_limit)
+            if status == "running":
+                status = "timeout"
+        if status == "solved":
+            results.append([number, board_to_line(board), status, time.perf_counter() - start])
+        else:
+            results.append([number, line, status, time.perf_counter() - start])
+    return results
+
+
+def read_chunks(lines, size):
+    """
+    group the non-empty lines into chunks
+    :param lines: iterable of lines
+    :param size: number of lines per chunk
+    :return: a generator of lists of [line number, line]
+    """
+    chunk = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append([number, line])
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def solve_stream(lines, workers=None, ordered=True, chunk_size=64, strategy=None, time_limit=None, cache_size=None):
+    """
+    solve boards on a process pool while they are read
+    :param lines: iterable of lines of 81 characters
+    :param workers: number of worker processes, None for one per core
+    :param ordered: True to yield results in input order, False to yield them as soon as they are ready
+    :param chunk_size: number of lines sent to a worker at once
+    :param strategy: name of a strategy in solver.STRATEGIES, None for the default strategy of every board's size
+    :param time_limit: seconds allowed per board, None for no limit
+    :param cache_size: number of solutions every worker keeps (solver.enable_solution_cache), None for no cache;
+                       boards solved with a time limit are not cached
+    :return: a generator of [line number, output line, status, seconds]
+    """
+    workers = workers or os.cpu_count()
+    max_pending = workers * 4
+    chunks = read_chunks(lines, chunk_size)
+
+    initializer = None if cache_size is None else enable_solution_cache
+    initargs = () if cache_size is None else (cache_size,)
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=initializer, initargs=initargs) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.submit(solve_chunk, chunk, strategy, time_limit))
+            if len(pending) < max_pending:
+                continue
+            if ordered:
+                yield from pending.popleft().result()
+            else:
+                finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    pending.remove(future)
+                    yield from future.result()
+
+        if ordered:
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            for future in concurrent.futures.as_completed(pending):
+                yield from future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve Sudoku boards given as lines of 81 characters.")
+    parser.add_argument("input", nargs="?", default="-", help="input file, - for stdin")
+    parser.add_argument("--output", default="-", help="output file, - for stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--unordered", action="store_true", help="write solutions as soon as they are ready")
+    parser.add_argument("--chunk-size", type=int, default=64, help="number of lines sent to a worker at once")
+    parser.add_argument("--strategy", choices=list(STRATEGIES),
+                        help="search strategy (default: row-major on 9x9 boards, propagate on larger ones)")
+    parser.add_argument("--timing", action="store_true", help="report the time of every board on stderr")
+    parser.add_argument("--time-limit", type=float, help="give up a board after this many seconds")
+    parser.add_argument("--cache", type=int, help="number of solutions every worker keeps for repeated boards")
+    args = parser.parse_args(argv)
+    if args.cache is not None and args.cache < 1:
+        parser.error("--cache must be at least 1")
+    if args.time_limit is not None:
+        try:
+            iterative_strategy(args.strategy)
+        except ValueError as error:
+            parser.error(str(error))
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    start = time.perf_counter()
+    counts = collections.Counter()
+    try:
+        for number, line, status, seconds in solve_stream(source, args.workers, not args.unordered,
+                                                          args.chunk_size, args.strategy, args.time_limit,
+                                                          args.cache):
+            out.write(line + "\n")
+            counts[status] += 1
+            if status != "solved":
+                print("line {}: {}".format(number, status), file=sys.stderr)
+            if args.timing:
+                print("line {}: {:.3f} ms".format(number, seconds * 1000), file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print("{} boards in {:.2f} s ({:.1f} boards/s): {} solved, {} unsolvable, {} timeout, {} malformed".format(
+        total, elapsed, total / elapsed if elapsed else 0.0, counts["solved"], counts["unsolvable"],
+        counts["timeout"], counts["malformed"]), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,175 @@
 Sudoku Solver
 """
 
+import collections
+import copy
+import json
+import random
+import threading
+import time
+
+# character of every digit in lines, boards up to 25x25 use letters after 9
+SYMBOLS = "0123456789ABCDEFGHIJKLMNOP"
+
+
+def box_size(b):
+    """
+    get the size of the boxes of a board
+    :param b: board
+    :return: 3 for a 9x9 board, 2 for 4x4, 4 for 16x16, 5 for 25x25
+    """
+    box = int(round(len(b) ** 0.5))
+    if box * box != len(b) or box < 2 or box > 5:
+        raise ValueError("unsupported board size: " + str(len(b)))
+    return box
+
+
 def print_board(b):
     """
     print board in good format in the console
     :param b: board
     """
+    box = box_size(b)
+    width = len(str(len(b)))
     for i in range(len(b)):
-        if i % 3 == 0 and i != 0:
-            print("- - - - - - - - - - - - -")
+        if i % box == 0 and i != 0:
+            print(" ".join("-" * width for _ in range(len(b) + (box - 1) * 2)))
 
         for j in range(len(b[0])):
-            if j % 3 == 0 and j != 0:
+            if j % box == 0 and j != 0:
                 print(" | ", end="")
-            if j != 8:
-                print(b[i][j], end=" ")
+            if j != len(b) - 1:
+                print(str(b[i][j]).rjust(width), end=" ")
             else:
-                print(b[i][j])
+                print(str(b[i][j]).rjust(width))
+
+
+def board_to_line(b):
+    """
+    convert a board to a single line with one character per square (see SYMBOLS), 0 for empty squares
+    :param b: board
+    :return: a string of 81 characters for a 9x9 board
+    """
+    return "".join(SYMBOLS[num] for row in b for num in row)
+
+
+def line_to_board(line):
+    """
+    convert a line with one character per square to a board, "0" or "." for empty squares
+    :param line: a string of 81 characters for a 9x9 board (16, 256 or 625 for the other sizes)
+    :return: board
+    """
+    line = line.strip().upper()
+    size = int(round(len(line) ** 0.5))
+    if size * size != len(line) or size not in (4, 9, 16, 25):
+        raise ValueError("expected 81 characters (16, 256 or 625 for other sizes), got " + str(len(line)))
+    board = []
+    for r in range(size):
+        row = []
+        for ch in line[r * size:r * size + size]:
+            num = 0 if ch == "." else SYMBOLS.find(ch)
+            if num < 0 or num > size:
+                raise ValueError("invalid square: " + ch)
+            row.append(num)
+        board.append(row)
+    return board
+
+
+class Board:
+    """
+    Class used to store a board in one flat bytearray (81 bytes for a 9x9 board) with a writable memoryview per row,
+    so that b[row][col] works as on a list of lists while copying the board is a single bytearray copy
+    """
+
+    __slots__ = ["size", "box", "cells", "rows"]
+
+    def __init__(self, b):
+        """
+        :param b: board as a list of lists or a Board (not modified, the squares are copied)
+        """
+        if isinstance(b, Board):
+            self.attach(b.box, bytearray(b.cells))
+        else:
+            self.attach(box_size(b), bytearray(num for row in b for num in row))
+
+    def attach(self, box, cells):
+        """
+        use cells as the squares of the board and build the row views
+        :param box: box size of the board
+        :param cells: bytearray of size * size squares in row-major order
+        """
+        self.box = box
+        self.size = box * box
+        self.cells = cells
+        view = memoryview(cells)
+        self.rows = tuple(view[r * self.size:(r + 1) * self.size] for r in range(self.size))
+
+    def copy(self):
+        """
+        :return: a new Board with the same squares
+        """
+        board = Board.__new__(Board)
+        board.attach(self.box, bytearray(self.cells))
+        return board
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __reduce__(self):
+        return Board, (self.to_list(),)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, row):
+        return self.rows[row]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __eq__(self, other):
+        if isinstance(other, Board):
+            return self.cells == other.cells
+        return self.to_list() == other
+
+    __hash__ = None
+
+    def get_row(self, row):
+        """
+        :return: writable memoryview of the squares of a row
+        """
+        return self.rows[row]
+
+    def get_col(self, col):
+        """
+        :return: writable memoryview of the squares of a column
+        """
+        return memoryview(self.cells)[col::self.size]
+
+    def get_box(self, index):
+        """
+        :param index: box index, boxes are numbered in row-major order
+        :return: list of box writable memoryviews, the rows of the box from top to bottom
+        """
+        row = (index // self.box) * self.box
+        col = (index % self.box) * self.box
+        return [self.rows[r][col:col + self.box] for r in range(row, row + self.box)]
+
+    def update(self, b):
+        """
+        copy the squares of another board of the same size into this one
+        :param b: board as a list of lists or a Board
+        """
+        self.cells[:] = b.cells if isinstance(b, Board) else bytes(num for row in b for num in row)
+
+    def to_list(self):
+        """
+        :return: the board as a list of lists
+        """
+        return [list(row) for row in self.rows]
 
 
 def find_empty(b):
@@ -29,6 +182,8 @@ def find_empty(b):
             ELSE:
                 return None
     """
+    if isinstance(b, Board):
+        b = b.rows
     for i in range(len(b)):
         for j in range(len(b[0])):
             if b[i][j] == 0:
@@ -48,6 +203,8 @@ def is_valid(b, num, pos):
             ELSE:
                 return False
     """
+    if isinstance(b, Board):
+        b = b.rows
 
     # check row
     for i in range(len(b[0])):
@@ -60,38 +217,1078 @@ def is_valid(b, num, pos):
             return False
 
     # check box
-    box_row = pos[0] // 3  # get the position of box where the square (given pos) is located
-    box_col = pos[1] // 3
+    box = box_size(b)
+    box_row = pos[0] // box  # get the position of box where the square (given pos) is located
+    box_col = pos[1] // box
 
-    for i in range(box_row * 3, box_row * 3 + 3):
-        for j in range(box_col * 3, box_col * 3 + 3):
+    for i in range(box_row * box, box_row * box + box):
+        for j in range(box_col * box, box_col * box + box):
             if b[i][j] == num and pos != [i, j]:
                 return False
 
     return True
 
 
-def solve(b):
+# digit n is stored in candidate masks as the bit 1 << (n - 1)
+# number of candidates for every mask of up to 16 digits
+POPCOUNT = [0] * (1 << 16)
+for _mask in range(1, 1 << 16):
+    POPCOUNT[_mask] = POPCOUNT[_mask >> 1] + (_mask & 1)
+
+
+def popcount(mask):
+    """
+    count the candidates of a mask of any size (POPCOUNT is faster for up to 16 digits)
+    :param mask: candidate mask
+    :return: an integer
+    """
+    return bin(mask).count("1")
+
+
+_peers = {}
+
+
+def get_peers(box):
+    """
+    get the squares sharing a row, a column or a box with each square (20 of them on a 9x9 board)
+    :param box: box size of the board
+    :return: a list indexed by row * size + col of lists of [row, col]
+    """
+    if box not in _peers:
+        size = box * box
+        _peers[box] = [[[r, c] for r in range(size) for c in range(size)
+                        if (r, c) != (row, col)
+                        and (r == row or c == col or (r // box == row // box and c // box == col // box))]
+                       for row in range(size) for col in range(size)]
+    return _peers[box]
+
+
+_units = {}
+
+
+def get_units(box):
+    """
+    get every row, column and box of a board
+    :param box: box size of the board
+    :return: a list of [kind, index, squares], kind is 0 for a row, 1 for a column and 2 for a box,
+             squares is a list of [row, col, box index]
+    """
+    if box not in _units:
+        size = box * box
+        units = []
+        for i in range(size):
+            units.append([0, i, [[i, c, (i // box) * box + c // box] for c in range(size)]])
+            units.append([1, i, [[r, i, (r // box) * box + i // box] for r in range(size)]])
+            units.append([2, i, [[(i // box) * box + j // box, (i % box) * box + j % box, i] for j in range(size)]])
+        _units[box] = units
+    return _units[box]
+
+
+# actions of the steps yielded by solve_steps
+TRY = 0  # a digit is written in a square to be tested
+ACCEPT = 1  # the digit breaks no rule, the search goes on with the next square
+BACKTRACK = 2  # every digit failed, the square is cleared and the search goes back to the previous one
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by a search that visited more nodes than its budget allows
+    """
+
+
+class Constraints:
+    """
+    Class used to keep row/column/box candidate masks of a board up to date while digits are placed and removed,
+    so that checking a digit is a single bit test instead of a scan of the row, the column and the box
+    """
+
+    def __init__(self, b):
+        if isinstance(b, Board):
+            b = b.to_list()  # search on lists, writing to the row views of a Board is twice as slow
+        self.board = b
+        self.size = len(b)
+        self.box = box_size(b)
+        self.all_digits = (1 << self.size) - 1
+        self.popcount = POPCOUNT.__getitem__ if self.size <= 16 else popcount
+        self.rows = [0] * self.size
+        self.cols = [0] * self.size
+        self.boxes = [0] * self.size
+        self.empties = []  # [row, col, box] of every empty square in row-major order
+        self.consistent = True  # False if the given numbers already break a rule
+        self.nodes = 0  # number of digits placed by the search so far
+
+        for r in range(self.size):
+            for c in range(self.size):
+                box = (r // self.box) * self.box + c // self.box
+                num = b[r][c]
+                if num == 0:
+                    self.empties.append([r, c, box])
+                    continue
+                bit = 1 << (num - 1)
+                if (self.rows[r] | self.cols[c] | self.boxes[box]) & bit:
+                    self.consistent = False
+                self.rows[r] |= bit
+                self.cols[c] |= bit
+                self.boxes[box] |= bit
+
+    def candidates(self, row, col):
+        """
+        get the digits that can still be placed in the square at [row, col]
+        :param row: row of square
+        :param col: column of square
+        :return: a mask with one bit per digit, bit n - 1 is set if digit n is allowed
+        """
+        return self.all_digits & ~(self.rows[row] | self.cols[col] | self.boxes[self.box_of(row, col)])
+
+    def box_of(self, row, col):
+        """
+        get the index of the box holding the square at [row, col]
+        :return: an integer, boxes are numbered in row-major order
+        """
+        return (row // self.box) * self.box + col // self.box
+
+    def candidate_count(self, row, col):
+        """
+        get the number of digits that can still be placed in the square at [row, col]
+        :param row: row of square
+        :param col: column of square
+        :return: an integer, 0 to the board size
+        """
+        return self.popcount(self.candidates(row, col))
+
+    def is_valid(self, num, pos):
+        """
+        check if inserting num in pos is valid
+        :param num: number to be inserted on the board
+        :param pos: position [row,col] of the square where the number needs to be inserted
+        :return: True if valid, False otherwise
+        """
+        return bool(self.candidates(pos[0], pos[1]) & (1 << (num - 1)))
+
+    def place(self, row, col, num):
+        """
+        place num in the square at [row, col] and update the masks
+        Note: this function will modify the board
+        """
+        bit = 1 << (num - 1)
+        self.rows[row] |= bit
+        self.cols[col] |= bit
+        self.boxes[self.box_of(row, col)] |= bit
+        self.board[row][col] = num
+
+    def remove(self, row, col):
+        """
+        clear the square at [row, col] and update the masks
+        Note: this function will modify the board
+        """
+        mask = ~(1 << (self.board[row][col] - 1))
+        self.rows[row] &= mask
+        self.cols[col] &= mask
+        self.boxes[self.box_of(row, col)] &= mask
+        self.board[row][col] = 0
+
+    def search(self, index=0):
+        """
+        fill the empty squares from empties[index] onwards using backtracking
+        Note: this function will modify the board
+        :param index: index of the next empty square in empties
+        :return: True if the rest of the board is solved, False otherwise
+        """
+        if index == len(self.empties):  # base case: board is solved (no empty square is left)
+            return True
+
+        row, col, box = self.empties[index]
+        rows = self.rows
+        cols = self.cols
+        boxes = self.boxes
+        b = self.board
+        candidates = self.all_digits & ~(rows[row] | cols[col] | boxes[box])
+        while candidates:
+            bit = candidates & -candidates  # lowest digit first, same order as range(1, 10)
+            candidates ^= bit
+            rows[row] |= bit
+            cols[col] |= bit
+            boxes[box] |= bit
+            b[row][col] = bit.bit_length()
+            self.nodes += 1
+
+            if self.search(index + 1):
+                return True
+
+            # reset to 0 if this approach cannot solve the board
+            rows[row] ^= bit
+            cols[col] ^= bit
+            boxes[box] ^= bit
+            b[row][col] = 0
+
+        return False
+
+    def undo(self, trail):
+        """
+        clear the squares filled by propagate
+        :param trail: list of [row, col] filled by propagate
+        """
+        for row, col in reversed(trail):
+            self.remove(row, col)
+        del trail[:]
+
+    def propagate(self, trail):
+        """
+        fill every naked single (a square with one candidate) and hidden single (a digit with one possible square
+        in a row, a column or a box) until none is left
+        Note: this function will modify the board
+        :param trail: list every filled [row, col] is appended to, so that undo can clear them
+        :return: IF a contradiction is found (a square or a digit of a unit has no candidate):
+                    return False
+                ELSE:
+                    return True
+        """
+        rows = self.rows
+        cols = self.cols
+        boxes = self.boxes
+        b = self.board
+        all_digits = self.all_digits
+        masks = [rows, cols, boxes]
+
+        changed = True
+        while changed:
+            changed = False
+            for row, col, box in self.empties:
+                if b[row][col] != 0:
+                    continue
+                mask = all_digits & ~(rows[row] | cols[col] | boxes[box])
+                if mask == 0:
+                    return False
+                if mask & (mask - 1) == 0:  # naked single
+                    self.place(row, col, mask.bit_length())
+                    trail.append([row, col])
+                    changed = True
+
+            for kind, index, squares in get_units(self.box):
+                once = 0  # digits allowed in at least one empty square of the unit
+                twice = 0  # digits allowed in at least two
+                for row, col, box in squares:
+                    if b[row][col] == 0:
+                        mask = all_digits & ~(rows[row] | cols[col] | boxes[box])
+                        twice |= once & mask
+                        once |= mask
+                if (once | masks[kind][index]) != all_digits:
+                    return False
+                hidden = once & ~twice
+                while hidden:  # hidden singles
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    if masks[kind][index] & bit:  # already placed by an earlier single of this pass
+                        continue
+                    for row, col, box in squares:
+                        if b[row][col] == 0 and not (rows[row] | cols[col] | boxes[box]) & bit:
+                            self.place(row, col, bit.bit_length())
+                            trail.append([row, col])
+                            changed = True
+                            break
+                    else:
+                        return False
+        return True
+
+    def count(self, limit=None, propagate=None, budget=None):
+        """
+        count the ways to fill the remaining empty squares, always branching on the square with the fewest candidates
+        Note: the board is modified during the search and restored before returning
+        :param limit: stop counting after this many solutions (None to count all of them)
+        :param propagate: True to fill naked and hidden singles before branching,
+                          None to do it on boards larger than 9x9 only
+        :param budget: raise BudgetExceeded once this many nodes have been visited, leaving the board modified
+                       (None for no limit)
+        :return: number of solutions, at most limit
+        """
+        if propagate is None:
+            propagate = self.size > 9
+        trail = []
+        if propagate and not self.propagate(trail):
+            self.undo(trail)
+            return 0
+
+        rows = self.rows
+        cols = self.cols
+        boxes = self.boxes
+        b = self.board
+        all_digits = self.all_digits
+        popcount = self.popcount
+
+        best = None
+        best_mask = 0
+        best_count = self.size + 1
+        for square in self.empties:
+            row, col, box = square
+            if b[row][col] != 0:
+                continue
+            mask = all_digits & ~(rows[row] | cols[col] | boxes[box])
+            count = popcount(mask)
+            if count < best_count:
+                best = square
+                best_mask = mask
+                best_count = count
+                if count <= 1:
+                    break
+        if best is None:  # base case: board is solved (no empty square is left)
+            self.undo(trail)
+            return 1
+
+        row, col, box = best
+        found = 0
+        while best_mask:
+            bit = best_mask & -best_mask
+            best_mask ^= bit
+            rows[row] |= bit
+            cols[col] |= bit
+            boxes[box] |= bit
+            b[row][col] = bit.bit_length()
+            self.nodes += 1
+            if budget is not None and self.nodes > budget:
+                raise BudgetExceeded()
+
+            found += self.count(None if limit is None else limit - found, propagate, budget)
+
+            rows[row] ^= bit
+            cols[col] ^= bit
+            boxes[box] ^= bit
+            b[row][col] = 0
+            if limit is not None and found >= limit:
+                break
+
+        self.undo(trail)
+        return found
+
+    def choose_square(self, strategy, rng):
+        """
+        choose the next empty square to fill based on the strategy
+        :param strategy: Strategy used for the search
+        :param rng: random.Random used to break ties when the strategy is randomized
+        :return: IF an empty square is left:
+                    return [row, col, box]
+                ELSE:
+                    return None
+        """
+        b = self.board
+        if strategy.square == "row-major":
+            for square in self.empties:
+                if b[square[0]][square[1]] == 0:
+                    return square
+            return None
+
+        # minimum remaining values: the square with the fewest candidates
+        best = None
+        best_count = self.size + 1
+        ties = []
+        for square in self.empties:
+            row, col, box = square
+            if b[row][col] != 0:
+                continue
+            count = self.popcount(self.all_digits & ~(self.rows[row] | self.cols[col] | self.boxes[box]))
+            if count < best_count:
+                best = square
+                best_count = count
+                ties = [square]
+                if count <= 1:  # cannot do better than a forced or a dead square
+                    break
+            elif count == best_count and strategy.randomized:
+                ties.append(square)
+        if strategy.randomized and len(ties) > 1:
+            return rng.choice(ties)
+        return best
+
+    def order_digits(self, row, col, candidates, strategy, rng):
+        """
+        order the candidate digits of the square at [row, col] based on the strategy
+        :param candidates: candidate mask of the square
+        :param strategy: Strategy used for the search
+        :param rng: random.Random used when the strategy is randomized
+        :return: a list of digits in the order they should be tried
+        """
+        digits = [num for num in range(1, self.size + 1) if candidates & (1 << (num - 1))]
+        if strategy.value == "lcv":
+            # least constraining value: try first the digit that removes the fewest candidates from the peers
+            peers = [[r, c] for r, c in get_peers(self.box)[row * self.size + col] if self.board[r][c] == 0]
+            counts = {}
+            for num in digits:
+                counts[num] = sum(1 for r, c in peers if self.candidates(r, c) & (1 << (num - 1)))
+            if strategy.randomized:
+                rng.shuffle(digits)  # random order between digits with the same count
+            digits.sort(key=counts.get)
+        elif strategy.randomized:
+            rng.shuffle(digits)
+        return digits
+
+    def search_with(self, strategy, rng, budget=None):
+        """
+        fill the remaining empty squares using backtracking driven by the strategy
+        Note: this function will modify the board
+        :param strategy: Strategy used for the search
+        :param rng: random.Random used when the strategy is randomized
+        :param budget: stop once this many nodes have been visited (None for no limit)
+        :return: IF the board is solved:
+                    return True
+                 IF the board cannot be solved:
+                    return False
+                 IF the budget ran out (the board is restored):
+                    return None
+        """
+        trail = []
+        if strategy.propagate and not self.propagate(trail):
+            self.undo(trail)
+            return False
+
+        square = self.choose_square(strategy, rng)
+        if square is None:  # base case: board is solved (no empty square is left)
+            return True
+
+        row, col, box = square
+        candidates = self.candidates(row, col)
+        result = False
+        for num in self.order_digits(row, col, candidates, strategy, rng):
+            if budget is not None and self.nodes >= budget:
+                result = None
+                break
+            self.place(row, col, num)
+            self.nodes += 1
+
+            result = self.search_with(strategy, rng, budget)
+            if result:
+                return True
+            self.remove(row, col)
+            if result is None:
+                break
+
+        self.undo(trail)
+        return result
+
+    def search_traced(self, strategy, rng, stats, budget=None, depth=0):
+        """
+        same search as search_with, recording what it does in stats
+        (a separate method so that the search without stats does not pay for the bookkeeping)
+        Note: this function will modify the board
+        :param strategy: Strategy used for the search
+        :param rng: random.Random used when the strategy is randomized
+        :param stats: SearchStats updated by the search
+        :param budget: stop once this many nodes have been visited (None for no limit)
+        :param depth: number of squares filled by the search above this call
+        :return: True if the board is solved, False if it cannot be solved, None if the budget ran out
+        """
+        start = time.perf_counter()
+        deeper = 0.0  # time spent in the calls below this one
+        stats.visit(depth)
+
+        result = False
+        trail = []
+        if strategy.propagate and not self.propagate(trail):
+            square = None
+        else:
+            square = self.choose_square(strategy, rng)
+            result = square is None  # base case: board is solved (no empty square is left)
+        if square is not None:
+            row, col, box = square
+            digits = self.order_digits(row, col, self.candidates(row, col), strategy, rng)
+            stats.branching[len(digits)] = stats.branching.get(len(digits), 0) + 1
+            for num in digits:
+                if budget is not None and self.nodes >= budget:
+                    result = None
+                    break
+                self.place(row, col, num)
+                self.nodes += 1
+                stats.nodes += 1
+
+                child_start = time.perf_counter()
+                result = self.search_traced(strategy, rng, stats, budget, depth + 1)
+                deeper += time.perf_counter() - child_start
+                if result:
+                    break
+                self.remove(row, col)
+                stats.backtracks += 1
+                if result is None:
+                    break
+
+        if not result:
+            self.undo(trail)
+        stats.depth_seconds[depth] += time.perf_counter() - start - deeper
+        return result
+
+    def search_steps(self, index=0):
+        """
+        same search as search, yielding every step; every digit is tried in turn (not only the candidates)
+        so that the steps also show the digits that break a rule
+        Note: this function will modify the board
+        :param index: index of the next empty square in empties
+        :return: a generator of (row, col, num, action) whose return value is True if the rest of the board is solved
+        """
+        if index == len(self.empties):  # base case: board is solved (no empty square is left)
+            return True
+
+        row, col, box = self.empties[index]
+        for num in range(1, self.size + 1):
+            yield row, col, num, TRY
+            if not self.is_valid(num, [row, col]):
+                continue
+            yield row, col, num, ACCEPT
+            self.place(row, col, num)
+            if (yield from self.search_steps(index + 1)):
+                return True
+            self.remove(row, col)
+
+        yield row, col, 0, BACKTRACK
+        return False
+
+
+class SearchStats:
+    """
+    Class used to record what a search did, pass one to solve to fill it in
+    """
+
+    def __init__(self):
+        self.nodes = 0  # digits placed
+        self.backtracks = 0  # digits removed again because they led to a dead end
+        self.restarts = 0
+        self.max_depth = 0
+        self.depth_nodes = []  # number of calls at each depth
+        self.depth_seconds = []  # time spent at each depth, not counting the deeper levels
+        self.branching = {}  # number of candidates of the chosen square -> number of times it happened
+        self.seconds = 0.0
+        self.solved = None
+
+    def visit(self, depth):
+        """
+        record a call of the search at depth
+        :param depth: number of squares filled by the search so far
+        """
+        while len(self.depth_nodes) <= depth:
+            self.depth_nodes.append(0)
+            self.depth_seconds.append(0.0)
+        self.depth_nodes[depth] += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def to_dict(self):
+        """
+        :return: a dict of the recorded values that can be converted to JSON
+        """
+        return {"solved": self.solved, "seconds": self.seconds, "nodes": self.nodes, "backtracks": self.backtracks,
+                "restarts": self.restarts, "max_depth": self.max_depth, "depth_nodes": self.depth_nodes,
+                "depth_seconds": self.depth_seconds,
+                "branching": {str(count): times for count, times in sorted(self.branching.items())}}
+
+    def to_json(self):
+        """
+        :return: the recorded values as a JSON string
+        """
+        return json.dumps(self.to_dict())
+
+
+class Strategy:
+    """
+    Class used to describe how the search chooses the next square and orders the digits to try
+    """
+
+    def __init__(self, name, square="row-major", value="ascending", randomized=False, restarts=0,
+                 node_budget=1000, growth=2, seed=None, propagate=False):
+        """
+        :param name: name used in reports
+        :param square: "row-major" (first empty square) or "mrv" (square with the fewest candidates)
+        :param value: "ascending" (1-9) or "lcv" (least constraining value first)
+        :param randomized: True to break ties and order digits randomly
+        :param restarts: number of restarts from an empty search before searching without a node budget
+        :param node_budget: node budget of the first attempt when restarts are used
+        :param growth: the node budget is multiplied by growth after every restart
+        :param seed: seed of the random generator, None for a different run every call
+        :param propagate: True to fill naked and hidden singles before every branch
+        """
+        self.name = name
+        self.square = square
+        self.value = value
+        self.randomized = randomized
+        self.restarts = restarts
+        self.node_budget = node_budget
+        self.growth = growth
+        self.seed = seed
+        self.propagate = propagate
+
+
+# built-in strategies, selected by name in solve
+STRATEGIES = {
+    "row-major": Strategy("row-major"),
+    "mrv": Strategy("mrv", square="mrv"),
+    "mrv-lcv": Strategy("mrv-lcv", square="mrv", value="lcv"),
+    "restarts": Strategy("restarts", square="mrv", randomized=True, restarts=8),
+    "propagate": Strategy("propagate", square="mrv", propagate=True),
+}
+
+
+def get_strategy(strategy, size=9):
+    """
+    get a Strategy from its name
+    :param strategy: a Strategy, a name in STRATEGIES or None for the default strategy of the board size
+    :param size: board size, the default strategy is "row-major" on 9x9 boards and "propagate" on larger ones
+    :return: Strategy
+    """
+    if strategy is None:
+        return STRATEGIES["row-major" if size <= 9 else "propagate"]
+    if isinstance(strategy, Strategy):
+        return strategy
+    if strategy not in STRATEGIES:
+        raise ValueError("unknown strategy: " + str(strategy))
+    return STRATEGIES[strategy]
+
+
+def iterative_strategy(strategy, size=9):
+    """
+    get a Strategy that IterativeSolver can run: neither randomized nor restarting
+    :param strategy: a Strategy, a name in STRATEGIES or None for the default strategy of the board size (get_strategy)
+    :param size: board size
+    :return: Strategy
     """
-    solve the given sudoku board using backtracking
+    strategy = get_strategy(strategy, size)
+    if strategy.randomized or strategy.restarts:
+        raise ValueError("strategy not supported by IterativeSolver: " + strategy.name)
+    return strategy
+
+
+def run_search(constraints, strategy, stats=None):
+    """
+    run the search on prepared constraints, restarting as the strategy requires
+    Note: this function will modify the board
+    :param constraints: Constraints of the board
+    :param strategy: Strategy used for the search
+    :param stats: SearchStats to record the search in, None to not record it
+    :return: True if the board is solved, False otherwise
+    """
+    if stats is not None:
+        return run_traced(constraints, strategy, stats)
+
+    if strategy.square == "row-major" and strategy.value == "ascending" and not strategy.randomized \
+            and not strategy.propagate:
+        return constraints.search()
+
+    rng = random.Random(strategy.seed)
+    budget = strategy.node_budget
+    for _ in range(strategy.restarts):
+        result = constraints.search_with(strategy, rng, constraints.nodes + budget)
+        if result is not None:
+            return result
+        budget *= strategy.growth
+
+    return constraints.search_with(strategy, rng)
+
+
+def run_traced(constraints, strategy, stats):
+    """
+    run_search recording the search in stats
+    """
+    start = time.perf_counter()
+    rng = random.Random(strategy.seed)
+    budget = strategy.node_budget
+    result = None
+    for _ in range(strategy.restarts):
+        result = constraints.search_traced(strategy, rng, stats, constraints.nodes + budget)
+        if result is not None:
+            break
+        stats.restarts += 1
+        budget *= strategy.growth
+    if result is None:
+        result = constraints.search_traced(strategy, rng, stats)
+
+    stats.solved = result
+    stats.seconds += time.perf_counter() - start
+    return result
+
+
+class CancelToken:
+    """
+    Class used to stop searches from outside: a search holding the token checks it before every node
+    """
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        ask every search holding this token to stop
+        """
+        self.cancelled = True
+
+
+class IterativeSolver:
+    """
+    Class used to run the backtracking search with an explicit stack instead of recursion, so that the search can run
+    for a number of nodes or seconds and resume later, be stopped with a CancelToken, and be saved in the middle
+    """
+
+    def __init__(self, b, strategy=None, token=None):
+        """
+        :param b: board, holds the solution once the status is "solved"
+        :param strategy: see iterative_strategy
+        :param token: CancelToken, None if the search cannot be cancelled
+        """
+        self.board = b
+        self.strategy = iterative_strategy(strategy, len(b))
+        self.token = token
+        self.constraints = Constraints(b)
+        # [row, col, digits left to try, trail] of every square chosen by the search, the deepest last;
+        # trail holds the [row, col] filled by propagation after the digit in the square was placed
+        self.stack = []
+        self.trail = []  # [row, col] filled by propagation before the first square was chosen
+        self.nodes = 0  # number of digits placed so far
+        self.status = "running" if self.constraints.consistent else "unsolvable"
+
+    def descend(self):
+        """
+        propagate the digit just placed if the strategy propagates, then choose the next square to fill and push it
+        on the stack, or finish the search if no empty square is left
+        """
+        constraints = self.constraints
+        if self.strategy.propagate:
+            trail = self.stack[-1][3] if self.stack else self.trail
+            if not constraints.propagate(trail):
+                constraints.undo(trail)
+                if not self.stack:
+                    self.finish("unsolvable")
+                return  # the digit just placed fails, the next step tries the next one
+        if self.strategy.square == "row-major" and not self.strategy.propagate:
+            depth = len(self.stack)  # square i of the stack is always empties[i]
+            square = constraints.empties[depth] if depth < len(constraints.empties) else None
+        else:
+            square = constraints.choose_square(self.strategy, None)
+        if square is None:
+            self.finish("solved")
+            return
+        row, col, box = square
+        digits = constraints.order_digits(row, col, constraints.candidates(row, col), self.strategy, None)
+        self.stack.append([row, col, digits, []])
+
+    def finish(self, status):
+        """
+        end the search
+        :param status: "solved" or "unsolvable"
+        """
+        self.status = status
+        if status == "solved" and isinstance(self.board, Board):
+            self.board.update(self.constraints.board)
+
+    def run(self, max_nodes=None, max_seconds=None):
+        """
+        search until the board is solved, proven unsolvable or cancelled, or until a budget runs out
+        Note: this function will modify the board (a Board is only written once solved)
+        :param max_nodes: return after placing this many more digits (None for no limit)
+        :param max_seconds: return after about this many seconds (None for no limit)
+        :return: the status: "running" if a budget ran out (call run again to resume), "solved", "unsolvable"
+                 or "cancelled"
+        """
+        constraints = self.constraints
+        board = constraints.board
+        deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+        nodes = 0
+        steps = 0
+        if self.status == "running" and not self.stack:
+            self.descend()
+
+        while self.status == "running":
+            if self.token is not None and self.token.cancelled:
+                self.status = "cancelled"
+                break
+            if max_nodes is not None and nodes >= max_nodes:
+                break
+            steps += 1
+            if deadline is not None and steps % 256 == 0 and time.perf_counter() >= deadline:
+                break
+
+            row, col, digits, trail = self.stack[-1]
+            if board[row][col] != 0:  # the digit in the square failed
+                constraints.undo(trail)
+                constraints.remove(row, col)
+            if digits:
+                constraints.place(row, col, digits.pop(0))
+                nodes += 1
+                self.descend()
+            else:  # every digit failed, go back to the previous square
+                self.stack.pop()
+                if not self.stack:
+                    self.finish("unsolvable")
+
+        self.nodes += nodes
+        return self.status
+
+    def next_solution(self):
+        """
+        go on after status "solved" to find the next solution: the stack still holds the path to the solution,
+        so the next run backtracks from its deepest square ("unsolvable" then means no solution is left)
+        """
+        if self.status == "solved":
+            self.status = "running" if self.stack else "unsolvable"
+
+    def to_dict(self):
+        """
+        save the search, resume it with resume_solver
+        :return: a dict {"board", "stack", "trail", "strategy", "nodes", "status"} of JSON types,
+                 board is the board with the digits placed so far as a line (see board_to_line)
+        """
+        return {"board": board_to_line(self.constraints.board),
+                "stack": [[row, col, list(digits), [list(square) for square in trail]]
+                          for row, col, digits, trail in self.stack],
+                "trail": [list(square) for square in self.trail],
+                "strategy": self.strategy.name, "nodes": self.nodes, "status": self.status}
+
+    def to_json(self):
+        """
+        :return: to_dict as a JSON string
+        """
+        return json.dumps(self.to_dict())
+
+
+def resume_solver(data, strategy=None, token=None):
+    """
+    rebuild an IterativeSolver saved with to_dict or to_json
+    :param data: dict or JSON string
+    :param strategy: Strategy of the saved search if it is not one of STRATEGIES, None to use the saved name
+    :param token: CancelToken, None if the search cannot be cancelled
+    :return: IterativeSolver, run it to go on with the search
+    """
+    if isinstance(data, str):
+        data = json.loads(data)
+    board = line_to_board(data["board"])
+    trail = [list(square) for square in data.get("trail", [])]
+    # saves without propagation may come without the trail of every square
+    stack = [[entry[0], entry[1], list(entry[2]), [list(square) for square in entry[3]] if len(entry) > 3 else []]
+             for entry in data["stack"]]
+    # clear the squares filled by the search so that they are not taken as given numbers,
+    # then place them again in the order the search filled them
+    placed = [[row, col, board[row][col]] for row, col in trail]
+    for row, col, digits, frame_trail in stack:
+        if board[row][col] != 0:
+            placed.append([row, col, board[row][col]])
+        placed.extend([r, c, board[r][c]] for r, c in frame_trail)
+    for row, col, num in placed:
+        board[row][col] = 0
+
+    solver = IterativeSolver(board, strategy or data["strategy"], token)
+    for row, col, num in placed:
+        solver.constraints.place(row, col, num)
+    solver.trail = trail
+    solver.stack = stack
+    solver.nodes = data["nodes"]
+    solver.status = data["status"]
+    return solver
+
+
+class SolutionCache:
+    """
+    Class used to keep the solutions of the boards solved last, the least recently used one is evicted first
+    (the counters and the entries are shared by every thread of the process)
+    """
+
+    def __init__(self, maxsize=1024):
+        """
+        :param maxsize: number of boards kept
+        """
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()  # board key -> squares of the solution as bytes, None if unsolvable
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        look a board up
+        :param key: key of the board (board_key)
+        :return: [True, solution] if the board is in the cache (solution None if it is unsolvable), else [False, None]
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, self.entries[key]
+
+    def put(self, key, solution):
+        """
+        store the solution of a board, evicting the least recently used boards beyond maxsize
+        :param key: key of the board (board_key)
+        :param solution: squares of the solution as bytes, None if the board is unsolvable
+        """
+        with self.lock:
+            self.entries[key] = solution
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        remove every board and reset the counters
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def to_dict(self):
+        """
+        :return: a dict of the counters that can be converted to JSON
+        """
+        with self.lock:
+            return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
+
+
+_solution_cache = None
+
+
+def enable_solution_cache(maxsize=1024):
+    """
+    put a SolutionCache of this process in front of solve (also usable as the initializer of a worker pool)
+    :param maxsize: number of boards kept
+    :return: the SolutionCache
+    """
+    global _solution_cache
+    _solution_cache = SolutionCache(maxsize)
+    return _solution_cache
+
+
+def disable_solution_cache():
+    """
+    stop caching the solutions of solve and drop the cache
+    """
+    global _solution_cache
+    _solution_cache = None
+
+
+def get_solution_cache():
+    """
+    :return: the SolutionCache of this process, None if it is disabled
+    """
+    return _solution_cache
+
+
+def board_key(b):
+    """
+    :param b: board
+    :return: the squares of the board as bytes, one byte per square
+    """
+    if isinstance(b, Board):
+        return bytes(b.cells)
+    return bytes(num for row in b for num in row)
+
+
+def solve(b, strategy=None, stats=None):
+    """
+    solve the given sudoku board using backtracking, or take the solution from the solution cache when it is enabled
+    (enable_solution_cache; not for randomized strategies or when recording stats, those always search)
     Note: this function will modify the board
     :param b: board
+    :param strategy: Strategy or name of one in STRATEGIES, None for row-major order with digits 1-9
+                     ("propagate" on boards larger than 9x9)
+    :param stats: SearchStats to record the search in, None to not record it
     :return: IF the board is solvable:
                 return True
             ELSE:
                 return False
     """
-    find = find_empty(b)
-    if not find:  # base case: board is solved (no empty square is found)
-        return True
+    strategy = get_strategy(strategy, len(b))
+    cache = _solution_cache
+    key = None
+    if cache is not None and stats is None and not strategy.randomized:
+        # boards with several solutions are solved differently by strategies: key on what decides the search order,
+        # not on the name, which a caller's Strategy may share with another one
+        key = (strategy.square, strategy.value, strategy.propagate, board_key(b))
+        found, solution = cache.get(key)
+        if found:
+            if solution is not None:
+                if isinstance(b, Board):
+                    b.cells[:] = solution
+                else:
+                    size = len(b)
+                    for r in range(size):
+                        b[r][:] = solution[r * size:r * size + size]
+            return solution is not None
 
-    for i in range(1, 10):
-        if is_valid(b, i, find):
-            b[find[0]][find[1]] = i
+    constraints = Constraints(b)
+    if not constraints.consistent:
+        if stats is not None:
+            stats.solved = False
+        if key is not None:
+            cache.put(key, None)
+        return False
+    solved = run_search(constraints, strategy, stats)
+    if solved and isinstance(b, Board):
+        b.update(constraints.board)
+    if key is not None:
+        cache.put(key, board_key(constraints.board) if solved else None)
+    return solved
 
-            if solve(b):
-                return True
-            b[find[0]][find[1]] = 0  # reset to 0 if this approach cannot solve the board
 
-    return False
+def count_solutions(b, limit=2, budget=None, stats=None):
+    """
+    count the solutions of the given sudoku board with a single search that stops as soon as limit is reached
+    Note: the board is modified during the search and restored before returning
+    :param b: board
+    :param limit: stop counting after this many solutions (None to count all of them)
+    :param budget: give up after visiting this many nodes (None for no limit)
+    :param stats: SearchStats whose nodes are increased by the nodes of this search, None to not count them
+    :return: IF the search finished:
+                return the number of solutions, at most limit
+            ELSE (the budget ran out):
+                return None
+    """
+    constraints = Constraints(b)
+    if not constraints.consistent:
+        return 0
+    try:
+        return constraints.count(limit, budget=budget)
+    except BudgetExceeded:
+        for row, col, box in constraints.empties:  # squares are only filled by the search, clear them again
+            constraints.board[row][col] = 0
+        return None
+    finally:
+        if stats is not None:
+            stats.nodes += constraints.nodes
 
+
+def solve_steps(b):
+    """
+    solve the given sudoku board in row-major order with digits 1-9, yielding every step of the search
+    (used to show how backtracking works; the board is not modified)
+    :param b: board
+    :return: a generator of (row, col, num, action): action is TRY, ACCEPT or BACKTRACK, num is 0 for BACKTRACK
+    """
+    constraints = Constraints([list(row) for row in b])
+    if constraints.consistent:
+        yield from constraints.search_steps()
+
+
+def compare_strategies(b, strategies=None):
+    """
+    solve copies of the same board with several strategies and record the work each one did
+    :param b: board (not modified)
+    :param strategies: list of Strategy or names, None for every strategy in STRATEGIES
+    :return: a list with a dict {"strategy", "solved", "nodes", "seconds"} per strategy
+    """
+    if strategies is None:
+        strategies = list(STRATEGIES)
+
+    report = []
+    for strategy in strategies:
+        strategy = get_strategy(strategy, len(b))
+        constraints = Constraints(copy.deepcopy(b))
+        start = time.perf_counter()
+        solved = constraints.consistent and run_search(constraints, strategy)
+        report.append({"strategy": strategy.name, "solved": solved, "nodes": constraints.nodes,
+                       "seconds": time.perf_counter() - start})
+    return report
+
+
+def print_strategy_report(b, strategies=None):
+    """
+    print the node counts of several strategies on the same board in the console
+    :param b: board (not modified)
+    :param strategies: list of Strategy or names, None for every strategy in STRATEGIES
+    """
+    for row in compare_strategies(b, strategies):
+        print("{:<12} {:<7} {:>10} nodes {:>10.4f} s".format(row["strategy"], str(row["solved"]), row["nodes"],
+                                                          row["seconds"]))
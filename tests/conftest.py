@@ -0,0 +1,44 @@
+import os
+import random
+import sys
+
+import pytest
+
+# the modules are at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import fill_diagonal  # noqa: E402
+from solver import solve  # noqa: E402
+
+
+def random_solution(rng, box=3):
+    """
+    :param rng: random.Random
+    :param box: box size
+    :return: a random completed board as a list of lists
+    """
+    size = box * box
+    b = [[0] * size for _ in range(size)]
+    fill_diagonal(b, rng)
+    solve(b, "propagate")
+    return b
+
+
+def random_board(rng, blanks, box=3):
+    """
+    :param rng: random.Random
+    :param blanks: number of squares cleared from a random completed board (the board may have several solutions)
+    :param box: box size
+    :return: [board, the completed board it was cleared from]
+    """
+    solution = random_solution(rng, box)
+    b = [row[:] for row in solution]
+    size = box * box
+    for square in rng.sample(range(size * size), blanks):
+        b[square // size][square % size] = 0
+    return b, solution
+
+
+@pytest.fixture
+def rng():
+    return random.Random(2024)
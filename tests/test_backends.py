@@ -0,0 +1,103 @@
+import backends
+import dlx
+import parallel_solve
+from conftest import random_board
+from solver import Board, IterativeSolver, count_solutions, solve
+
+LIMIT = 20
+
+
+def iterative_count(b, strategy, limit=LIMIT):
+    """
+    count the solutions of a board with IterativeSolver.next_solution
+    """
+    solver = IterativeSolver([row[:] for row in b], strategy)
+    found = 0
+    while found < limit and solver.run() == "solved":
+        found += 1
+        solver.next_solution()
+    return found
+
+
+def with_conflict(b):
+    """
+    :return: a copy of the board with a digit of a row repeated in an empty square of that row
+    """
+    b = [row[:] for row in b]
+    row = next(row for row in b if 0 in row and any(row))
+    row[row.index(0)] = next(num for num in row if num)
+    return b
+
+
+def test_counts_agree_on_random_boards(rng):
+    for blanks in [40, 50, 55, 58, 60, 62, 64]:
+        for _ in range(3):
+            b, _ = random_board(rng, blanks)
+            original = [row[:] for row in b]
+            expected = count_solutions(b, LIMIT)
+            assert b == original
+            assert 1 <= expected <= LIMIT
+            for backend in backends.BACKENDS:
+                assert backends.count_solutions(b, LIMIT, backend) == expected, backend
+            assert dlx.count_solutions(b, LIMIT) == expected
+            for strategy in ["row-major", "mrv", "propagate"]:
+                assert iterative_count(b, strategy) == expected, strategy
+            assert b == original
+
+
+def test_counts_agree_on_boards_with_conflicts(rng):
+    for blanks in [30, 60]:
+        b = with_conflict(random_board(rng, blanks)[0])
+        assert count_solutions(b, LIMIT) == 0
+        for backend in backends.BACKENDS:
+            assert backends.count_solutions(b, LIMIT, backend) == 0, backend
+        assert iterative_count(b, "propagate") == 0
+
+
+def test_backends_solve_to_the_same_solution(rng):
+    for blanks in [45, 55, 58]:
+        b, solution = random_board(rng, blanks)
+        if count_solutions(b, 2) != 1:
+            continue
+        for backend in backends.BACKENDS:
+            board = [row[:] for row in b]
+            assert backends.solve(board, backend), backend
+            assert board == solution, backend
+        for strategy in ["row-major", "mrv", "mrv-lcv", "restarts", "propagate"]:
+            board = Board(b)
+            assert solve(board, strategy), strategy
+            assert board.to_list() == solution, strategy
+
+
+def test_counts_agree_on_16x16(rng):
+    b, _ = random_board(rng, 140, box=4)
+    expected = count_solutions(b, 5)
+    assert expected >= 1
+    assert dlx.count_solutions(b, 5) == expected
+    assert iterative_count(b, "propagate", 5) == expected
+
+
+def test_parallel_count_with_work_donation(rng, monkeypatch, tmp_path):
+    # the whole board is one subproblem and the workers check for idle workers after every node, so the second
+    # worker only gets work donated by the first; the workers are forked and see the patched module
+    monkeypatch.setattr(parallel_solve, "SPLIT_FACTOR", 0)
+    monkeypatch.setattr(parallel_solve, "SLICE_NODES", 1)
+    log = tmp_path / "donations"
+    donate = parallel_solve.donate
+
+    def logged_donate(solver, base):
+        boards = donate(solver, base)
+        with open(log, "a") as f:
+            f.write("{}\n".format(len(boards)))
+        return boards
+
+    monkeypatch.setattr(parallel_solve, "donate", logged_donate)
+    b, _ = random_board(rng, 52)  # some hundreds of solutions
+    expected = count_solutions(b, None)
+    assert expected > 3
+    assert parallel_solve.parallel_count(b, workers=2) == expected
+    assert any(int(line) for line in log.read_text().split())
+    assert parallel_solve.parallel_count(b, limit=3, workers=2) == 3
+    board = [row[:] for row in b]
+    assert parallel_solve.parallel_solve(board, workers=2) == "solved"
+    assert count_solutions(board, 2) == 1 and all(b[r][c] in (0, board[r][c]) for r in range(9) for c in range(9))
@@ -0,0 +1,122 @@
+import pytest
+
+from conftest import random_board
+from canonical import ClassSolveCache, TooManyTies, canonical_key, canonicalize, dedup, transposed
+from generator import generate
+from solver import Board, count_solutions, is_valid, solve
+
+
+def shuffled(rng, items):
+    items = list(items)
+    rng.shuffle(items)
+    return items
+
+
+def random_symmetry(rng, b, box=3):
+    """
+    apply a random Sudoku symmetry: permute the bands, the rows of every band, the stacks, the columns of every stack,
+    relabel the digits and transpose with probability 1/2
+    :return: the transformed board as a list of lists
+    """
+    size = box * box
+    rows = [band * box + r for band in shuffled(rng, range(box)) for r in shuffled(rng, range(box))]
+    cols = [stack * box + c for stack in shuffled(rng, range(box)) for c in shuffled(rng, range(box))]
+    digits = [0] + shuffled(rng, range(1, size + 1))
+    g = [[digits[b[r][c]] for c in cols] for r in rows]
+    return transposed(g) if rng.random() < 0.5 else g
+
+
+def test_key_is_invariant_under_symmetries(rng):
+    for blanks in [20, 30, 50, 60, 70]:
+        b, _ = random_board(rng, blanks)
+        key = canonical_key(b)
+        for _ in range(10):
+            assert canonical_key(random_symmetry(rng, b)) == key
+
+
+def test_key_is_invariant_on_16x16(rng):
+    b, _ = random_board(rng, 100, box=4)
+    key = canonical_key(b)
+    for _ in range(3):
+        assert canonical_key(random_symmetry(rng, b, box=4)) == key
+
+
+def test_transform_maps_to_the_canonical_board_and_back(rng):
+    for blanks in [20, 45, 64]:
+        b, _ = random_board(rng, blanks)
+        canonical, transform = canonicalize(b)
+        assert transform.apply(b) == canonical
+        assert transform.invert(canonical) == b
+
+
+def test_different_boards_have_different_keys(rng):
+    b, solution = random_board(rng, 50)
+    other = [row[:] for row in b]
+    for r in range(9):
+        if other[r].count(0) > 0:
+            c = other[r].index(0)
+            other[r][c] = solution[r][c]  # one more clue: a different class
+            break
+    assert canonical_key(other) != canonical_key(b)
+
+
+def test_dedup_keeps_one_board_per_class(rng):
+    boards = [random_board(rng, 50)[0] for _ in range(3)]
+    items = [random_symmetry(rng, b) for b in boards for _ in range(4)]
+    kept = list(dedup(items))
+    assert len(kept) == 3
+    assert kept[0] is items[0]
+
+
+def test_class_solve_cache_maps_solutions_back(rng):
+    cache = ClassSolveCache()
+    b = generate("Medium", seed=1).puzzle
+    variants = [b] + [random_symmetry(rng, b) for _ in range(8)]
+    for variant in variants:
+        board = [row[:] for row in variant]
+        assert count_solutions(board, 2) == 1  # the solution found does not depend on the search order
+        expected = [row[:] for row in variant]
+        solve(expected)
+        assert cache.solve(board)
+        assert board == expected
+    assert cache.misses == 1
+    assert cache.hits == len(variants) - 1
+
+
+def test_class_solve_cache_keeps_the_givens_of_boards_with_several_solutions(rng):
+    cache = ClassSolveCache()
+    b, _ = random_board(rng, 64)
+    for variant in [b] + [random_symmetry(rng, b) for _ in range(5)]:
+        board = Board(variant)
+        assert cache.solve(board)
+        assert all(board[r][c] and is_valid(board, board[r][c], [r, c]) for r in range(9) for c in range(9))
+        assert all(variant[r][c] in (0, board[r][c]) for r in range(9) for c in range(9))
+
+
+def test_class_solve_cache_unsolvable_board(rng):
+    cache = ClassSolveCache()
+    b, _ = random_board(rng, 50)
+    r = next(r for r in range(9) if 0 in b[r])
+    c = b[r].index(0)
+    b[r][c] = next(num for num in b[r] if num)  # repeat a digit of the row
+    for variant in [b, random_symmetry(rng, b)]:
+        board = [row[:] for row in variant]
+        assert not cache.solve(board)
+        assert board == variant
+    assert cache.hits == 1
+
+
+def test_sparse_boards_give_up_and_are_solved_without_the_cache():
+    empty = [[0] * 9 for _ in range(9)]
+    one_clue = [row[:] for row in empty]
+    one_clue[4][4] = 5
+    for b in [empty, one_clue]:
+        with pytest.raises(TooManyTies):
+            canonicalize(b)
+        cache = ClassSolveCache()
+        board = [row[:] for row in b]
+        assert cache.solve(board)
+        assert all(board[r][c] and is_valid(board, board[r][c], [r, c]) for r in range(9) for c in range(9))
+        assert board[4][4] == b[4][4] or not b[4][4]
+        assert cache.uncached == 1 and cache.hits == cache.misses == 0
+    assert len(list(dedup([empty, [row[:] for row in empty], one_clue]))) == 2